@@ -0,0 +1,244 @@
+# ------------------ARENA-----------------
+# Several snakes and several apples on one board, for local multiplayer and bot
+# opponents. Like engine.py it knows nothing about pygame. Every tick all the
+# snakes move at the same time:
+#
+#   1. every tail moves out of the way (unless its snake is growing)
+#   2. a head outside the board or on any snake block dies
+#   3. heads that meet in the same cell: the longest snake survives, equal lengths all die
+#   4. the survivors move and eat the apples under their heads, the dead leave the board
+#
+# The board grid stores which snake is in every cell (its owner number, 0 for nobody),
+# so every check above is one lookup per snake: a tick costs O(snakes + apples eaten),
+# however long the snakes are.
+#
+#   python arena.py   times crowded arenas of bots
+import random
+import time
+from collections import deque
+import engine
+from engine import DIRECTIONS, OPPOSITE, RIGHT, HIT_WALL, BIT_HIMSELF, FRUIT_REWARD, DEATH_REWARD
+# ----------------------------------------
+
+BIT_ANOTHER = "bit another snake"
+HEAD_ON = "lost a head-on crash"
+
+MAX_SNAKES = 255  # Owner numbers are stored in a bytearray
+SNAKE_LENGTH = 3  # Every snake starts 3 blocks long, facing right
+SLOT_WIDTH = SNAKE_LENGTH + 3  # Starting snakes in the same row have 3 empty cells between them
+
+
+# One snake of the arena. It has the fields of engine.Engine that main.Snake draws
+# from (body, grid, owner, moves, steps, cell_number, vacated), so the game draws
+# every snake of the arena exactly like Charlie.
+class ArenaSnake:
+    def __init__(self, arena, owner):
+        self.owner = owner  # The number written into the grid for this snake's blocks
+        self.grid = arena.grid
+        self.steps = arena.steps
+        self.cell_number = arena.cell_number
+        self.body = deque()  # packed cells, the head is body[0] and the tail body[-1]
+        self.direction = RIGHT
+        self.new_block = False
+        self.alive = True
+        self.death = None  # Why the snake died
+        self.score = 0
+        self.moves = 0  # Counts the moves, and jumps when the snake is put down somewhere new
+        self.ate = False
+        self.vacated = None  # The cell the tail left during the last step
+
+    def turn(self, action):  # Change direction unless the snake would bite its own neck
+        if action is not None and action != OPPOSITE[self.direction]:
+            self.direction = action
+
+
+class Arena:
+    def __init__(self, cell_number=engine.CELL_NUMBER, snakes=2, fruits=1, seed=None):
+        if not 1 <= snakes <= MAX_SNAKES:
+            raise ValueError(f"An arena has 1 to {MAX_SNAKES} snakes, not {snakes}")
+        self.cell_number = cell_number
+        self.rng = random.Random()
+        self.seed = None
+        self.grid = bytearray(cell_number * cell_number)  # owner of the snake block in every cell, 0 if none
+        self.free = engine.FreeCells(cell_number * cell_number)  # every cell without a snake block or an apple
+        self.steps = tuple(dx + dy * cell_number for dx, dy in DIRECTIONS)  # packed step for every action
+        self.fruit_count = fruits  # How many apples are on the board at once
+        self.fruits = set()  # packed cells of the apples
+        self.snakes = [ArenaSnake(self, owner) for owner in range(1, snakes + 1)]
+        self.alive = []  # The snakes still playing, in owner order
+        self.ticks = 0
+        self.done = False
+        self.start_cells()  # Fail now if the board is too small
+        self.reset(seed)
+
+    def cell(self, x, y):  # (x, y) -> packed cell
+        return y * self.cell_number + x
+
+    def xy(self, cell):  # packed cell -> (x, y)
+        y, x = divmod(cell, self.cell_number)
+        return x, y
+
+    def start_cells(self):  # Where every head starts: spread over rows of slots 2 cells apart
+        slots = [(x, y) for y in range(1, self.cell_number - 1, 2)
+                 for x in range(SNAKE_LENGTH - 1, self.cell_number - 2, SLOT_WIDTH)]
+        if len(slots) < len(self.snakes):
+            raise ValueError(f"A {self.cell_number}x{self.cell_number} board has room for "
+                             f"{len(slots)} snakes, not {len(self.snakes)}")
+        return [self.cell(*slots[index * len(slots) // len(self.snakes)]) for index in range(len(self.snakes))]
+
+    def reset(self, seed=None):
+        if seed is None:  # Every game gets a seed, so any game can be played again
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.grid[:] = bytes(len(self.grid))
+        self.free.reset()
+        self.fruits.clear()
+        for snake, head in zip(self.snakes, self.start_cells()):
+            self.place(snake, [head - block for block in range(SNAKE_LENGTH)])
+        self.alive = list(self.snakes)
+        self.ticks = 0
+        self.done = False
+        self.place_fruits()
+
+    def place(self, snake, cells):  # Put a snake on the given cells (head first)
+        snake.body.clear()
+        for block in cells:
+            snake.body.append(block)
+            self.occupy(block, snake.owner)
+        snake.direction = RIGHT
+        snake.new_block = False
+        snake.alive = True
+        snake.death = None
+        snake.score = 0
+        snake.ate = False
+        snake.vacated = None
+        snake.moves += len(cells) + 1  # Further than any single move, see engine.Engine.count_placement
+
+    def occupy(self, cell, owner):  # A snake block moves into the cell
+        self.grid[cell] = owner
+        if cell in self.free:  # An apple's cell was taken out of the free cells already
+            self.free.remove(cell)
+
+    def vacate(self, cell):  # A snake block leaves the cell
+        self.grid[cell] = 0
+        self.free.add(cell)
+
+    def place_fruits(self):  # Top the apples up to fruit_count (fewer if the board is full)
+        while len(self.fruits) < self.fruit_count:
+            cell = self.free.choice(self.rng)
+            if cell is None:
+                return
+            self.free.remove(cell)
+            self.fruits.add(cell)
+
+    def leaving(self, cell):  # Will the snake block in this cell move away on the next tick?
+        owner = self.grid[cell]
+        if not owner:
+            return True
+        snake = self.snakes[owner - 1]
+        return cell == snake.body[-1] and not snake.new_block
+
+    def step(self, actions=()):  # One action per snake (None keeps going), returns every snake's reward
+        rewards = [0] * len(self.snakes)
+        if self.done:  # A finished game stays finished until reset()
+            return rewards
+        self.ticks += 1
+        for snake, action in zip(self.snakes, actions):
+            if snake.alive:
+                snake.turn(action)
+
+        # 1. The tails move out of the way first, so a head may follow any tail closely
+        for snake in self.alive:
+            snake.ate = False
+            snake.vacated = None
+            if snake.new_block:  # Grow: keep the tail where it is
+                snake.new_block = False
+            else:
+                snake.vacated = snake.body.pop()
+                self.vacate(snake.vacated)
+
+        # 2. Walls and bodies: one look at the grid per head
+        heads = {}  # new head cell -> the snakes moving there
+        for snake in self.alive:
+            head_x, head_y = self.xy(snake.body[0])
+            step_x, step_y = DIRECTIONS[snake.direction]
+            if not (0 <= head_x + step_x < self.cell_number and 0 <= head_y + step_y < self.cell_number):
+                snake.death = HIT_WALL
+                continue
+            new_head = snake.body[0] + self.steps[snake.direction]
+            owner = self.grid[new_head]
+            if owner:
+                snake.death = BIT_HIMSELF if owner == snake.owner else BIT_ANOTHER
+                continue
+            heads.setdefault(new_head, []).append(snake)
+
+        # 3. Head-on crashes: only the longest snake comes out of the cell alive
+        for crashed in heads.values():
+            if len(crashed) > 1:
+                longest = max(len(snake.body) for snake in crashed)
+                winners = [snake for snake in crashed if len(snake.body) == longest]
+                for snake in crashed:
+                    if len(winners) > 1 or snake is not winners[0]:
+                        snake.death = HEAD_ON
+
+        # 4. The survivors move and eat, the dead are taken off the board
+        survivors = []
+        for snake in self.alive:
+            if snake.death is not None:
+                snake.alive = False
+                rewards[snake.owner - 1] = DEATH_REWARD
+                for block in snake.body:
+                    self.vacate(block)
+                continue
+            new_head = snake.body[0] + self.steps[snake.direction]
+            snake.body.appendleft(new_head)
+            self.occupy(new_head, snake.owner)
+            snake.moves += 1
+            if new_head in self.fruits:
+                self.fruits.remove(new_head)
+                snake.new_block = True
+                snake.ate = True
+                snake.score += 1
+                rewards[snake.owner - 1] = FRUIT_REWARD
+            survivors.append(snake)
+        self.alive = survivors
+        self.place_fruits()
+        if not survivors:
+            self.done = True
+        return rewards
+
+
+def greedy_agent(arena, snake):  # The closest apple, without crashing into anything on the next tick
+    head_x, head_y = arena.xy(snake.body[0])
+    fruits = [arena.xy(fruit) for fruit in arena.fruits]
+    best = None
+    for action, (step_x, step_y) in enumerate(DIRECTIONS):
+        if action == OPPOSITE[snake.direction]:
+            continue
+        x, y = head_x + step_x, head_y + step_y
+        if not (0 <= x < arena.cell_number and 0 <= y < arena.cell_number):
+            continue
+        if not arena.leaving(arena.cell(x, y)):
+            continue
+        distance = min((abs(x - fruit_x) + abs(y - fruit_y) for fruit_x, fruit_y in fruits), default=0)
+        if best is None or distance < best[0]:
+            best = (distance, action)
+    return None if best is None else best[1]
+
+
+def ticks_per_second(snakes, cell_number, fruits, ticks=2000, seed=0):  # Bots only, restarting when all die
+    arena = Arena(cell_number, snakes, fruits, seed)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if arena.done:
+            arena.reset()
+        arena.step([greedy_agent(arena, snake) if snake.alive else None for snake in arena.snakes])
+    return ticks / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    for snakes, cell_number in ((2, 20), (12, 40), (48, 80), (192, 160)):
+        rate = ticks_per_second(snakes, cell_number, fruits=snakes)
+        print(f"{snakes} snakes on {cell_number}x{cell_number}: {rate:,.0f} ticks/sec "
+              f"({rate * snakes:,.0f} snake moves/sec, bots included)")
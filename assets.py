@@ -0,0 +1,86 @@
+# ------------------ASSET CACHE-----------------
+# Every image of the game is read from disk once per process and every surface the
+# game draws with is prepared once per (skin, part, cell size). Restarting the game
+# or switching skins only looks the surfaces up again.
+import threading
+import pygame
+# ----------------------------------------------
+
+SKINS = (1, 2, 3)
+
+# Names of the images every Images/Skin_<n>/ folder has
+SKIN_PARTS = ("head_up", "head_down", "head_right", "head_left",
+              "tail_up", "tail_down", "tail_right", "tail_left",
+              "body_vertical", "body_horizontal",
+              "body_tr", "body_tl", "body_br", "body_bl")
+
+# The head and tail images are the "up" image turned by these angles (counter-clockwise)
+ROTATIONS = {"up": 0, "left": 90, "down": 180, "right": -90}
+
+
+class Assets:
+    def __init__(self, rotate=True):
+        self.rotate = rotate  # Derive the head/tail orientations from the "up" image instead of loading 4 files
+        self.files = {}  # path -> surface exactly as it was read from disk
+        self.surfaces = {}  # (skin, part, cell_size) -> surface ready to be drawn
+        self.preloader = None  # background thread started by preload()
+
+    def load_file(self, path):  # Read an image from disk, only the first time it is asked for
+        surface = self.files.get(path)
+        if surface is None:
+            surface = pygame.image.load(path)
+            self.files[path] = surface
+        return surface
+
+    def prepare(self, path, cell_size):  # Convert for fast blitting and scale to the cell size
+        surface = self.load_file(path).convert_alpha()
+        if cell_size is not None and surface.get_size() != (cell_size, cell_size):
+            surface = pygame.transform.smoothscale(surface, (cell_size, cell_size))
+        return surface
+
+    def image(self, name, cell_size=None):  # Images/<name>.png, e.g. the apple
+        key = (None, name, cell_size)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.prepare(f"Images/{name}.png", cell_size)
+            self.surfaces[key] = surface
+        return surface
+
+    def skin_part(self, skin, part, cell_size):  # One image of a snake skin
+        key = (skin, part, cell_size)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            kind, facing = part.split("_")
+            if self.rotate and kind in ("head", "tail") and facing != "up":
+                surface = pygame.transform.rotate(self.skin_part(skin, kind + "_up", cell_size), ROTATIONS[facing])
+            else:
+                surface = self.prepare(f"Images/Skin_{skin}/{part}.png", cell_size)
+            self.surfaces[key] = surface
+        return surface
+
+    def skin(self, skin, cell_size):  # Every image of a snake skin, by part name
+        return {part: self.skin_part(skin, part, cell_size) for part in SKIN_PARTS}
+
+    def skin_files(self, skin):  # The files a skin needs from disk
+        parts = SKIN_PARTS
+        if self.rotate:
+            parts = [part for part in SKIN_PARTS if not part.startswith(("head_", "tail_")) or part.endswith("_up")]
+        return [f"Images/Skin_{skin}/{part}.png" for part in parts]
+
+    def preload(self, skins=SKINS):  # Read every skin in the background while the player looks at the menu
+        # Only reading and decoding the files happens on the thread, converting them needs
+        # the display and is done by the game itself the first time a surface is used
+        paths = ["Images/apple.png"]
+        for skin in skins:
+            paths += self.skin_files(skin)
+
+        def read_all():
+            for path in paths:
+                self.load_file(path)
+
+        self.preloader = threading.Thread(target=read_all, name="asset-preloader", daemon=True)
+        self.preloader.start()
+        return self.preloader
+
+
+ASSETS = Assets()  # Shared by the whole game
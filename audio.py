@@ -0,0 +1,121 @@
+# ------------------SOUND POOL-----------------
+# Every sound effect is decoded once and played through a few mixer channels that are
+# reserved for effects. When all of them are busy the one that started first is cut
+# off (voice stealing). With audio disabled every call does nothing, so headless runs
+# never touch the mixer. Opening the mixer is slow on some sound cards, so preload()
+# does it on a thread while the menu is already on screen.
+import threading
+import time
+import pygame
+# ---------------------------------------------
+
+EFFECTS = {
+    "crunch": "Sounds/crunch.wav",  # How Charlie eating sounds like?
+    "hit": "Sounds/hit.wav",  # How Charlie being hit sounds like?
+}
+CHANNELS = 4  # Mixer channels reserved for the effects
+MIXER = (44100, -16, 2, 512)  # frequency, size, channels and buffer the mixer is opened with
+
+
+class Audio:
+    def __init__(self, channels=CHANNELS, enabled=True):
+        self.enabled = enabled
+        self.channel_count = channels
+        self.sounds = {}  # effect name -> decoded pygame Sound
+        self.channels = []  # the reserved mixer channels
+        self.started = []  # when the sound on every channel started (for voice stealing)
+
+        # Counters, to see what playing sounds costs
+        self.plays = 0  # sounds started
+        self.steals = 0  # sounds cut off to make room for a new one
+        self.play_time = 0.0  # seconds spent inside play()
+        self.max_play_time = 0.0  # the slowest single play()
+        self.decode_time = 0.0  # seconds spent decoding the WAV files
+        self.preloader = None  # background thread started by preload()
+
+    def disable(self):  # Every call becomes a no-op (headless runs, no sound card)
+        self.enabled = False
+
+    def ready(self):  # Reserve the channels the first time a sound is played
+        if not self.enabled:
+            return False
+        if self.preloader is not None and self.preloader.is_alive():  # Not ready yet, skip the sound
+            return False
+        if not self.channels:
+            if not self.open_mixer():  # There is no mixer to play on
+                return False
+            if pygame.mixer.get_num_channels() < self.channel_count:
+                pygame.mixer.set_num_channels(self.channel_count)
+            pygame.mixer.set_reserved(self.channel_count)
+            self.channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+            self.started = [0.0] * self.channel_count
+        return True
+
+    def load(self, name):  # Decode an effect (only the first time)
+        sound = self.sounds.get(name)
+        if sound is None:
+            start = time.perf_counter()
+            sound = pygame.mixer.Sound(EFFECTS[name])
+            sound.set_volume(1.0)
+            self.decode_time += time.perf_counter() - start
+            self.sounds[name] = sound
+        return sound
+
+    def open_mixer(self):  # Open the mixer unless someone already did (False if there is no sound card)
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init(*MIXER)
+            except pygame.error:
+                self.enabled = False
+                return False
+        return True
+
+    def preload(self):  # Open the mixer and decode every effect on a thread, before the first apple
+        if not self.enabled:
+            return None
+
+        def load_all():
+            if self.open_mixer():
+                for name in EFFECTS:
+                    self.load(name)
+
+        self.preloader = threading.Thread(target=load_all, name="audio-preloader", daemon=True)
+        self.preloader.start()
+        return self.preloader
+
+    def play(self, name):
+        if not self.ready():
+            return
+        start = time.perf_counter()
+        sound = self.load(name)
+
+        # A free channel if there is one, otherwise the one playing the oldest sound
+        index = 0
+        for channel_index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                index = channel_index
+                break
+            if self.started[channel_index] < self.started[index]:
+                index = channel_index
+        else:
+            self.steals += 1
+
+        self.channels[index].play(sound)
+        self.started[index] = start
+        self.plays += 1
+
+        took = time.perf_counter() - start
+        self.play_time += took
+        self.max_play_time = max(self.max_play_time, took)
+
+    def stats(self):  # The counters as a dict (e.g. to print or dump as JSON)
+        return {
+            "plays": self.plays,
+            "steals": self.steals,
+            "average_play_ms": 1000 * self.play_time / self.plays if self.plays else 0.0,
+            "max_play_ms": 1000 * self.max_play_time,
+            "decode_ms": 1000 * self.decode_time,
+        }
+
+
+AUDIO = Audio()  # Shared by the whole game
@@ -0,0 +1,218 @@
+# ------------------BATCHED SIMULATION ENGINE------------------
+# Many independent Hungry Charlie boards stepped together with NumPy. The rules are
+# the ones of engine.Engine (move, eat the apple, hit the wall or bite himself), but
+# every rule is applied to the whole batch at once with array operations, and boards
+# that finish are started again automatically.
+#
+#   python batch_engine.py   checks the batch against engine.Engine and times both
+import time
+from collections import namedtuple
+import numpy as np
+import engine
+# -------------------------------------------------------------
+
+# Game over reasons, stored as small ints in BatchEngine.death (indexes into engine.DEATHS)
+ALIVE = 0
+WALL = 1
+SELF = 2
+FILLED = 3
+
+STEP_X = np.array([dx for dx, dy in engine.DIRECTIONS], dtype=np.int64)
+STEP_Y = np.array([dy for dx, dy in engine.DIRECTIONS], dtype=np.int64)
+OPPOSITE = np.array(engine.OPPOSITE, dtype=np.int64)
+
+# What a finished board scored before it was reset
+Result = namedtuple("Result", ["score", "length", "ticks", "death"])
+
+
+class BatchEngine:
+    def __init__(self, boards, cell_number=engine.CELL_NUMBER, seed=None, auto_reset=True):
+        engine.check_cell_number(cell_number)
+        self.boards = boards
+        self.cell_number = cell_number
+        self.cells = cell_number * cell_number
+        self.auto_reset = auto_reset  # Start finished boards again at the end of step()
+        self.rng = np.random.default_rng(seed)
+
+        # Every body is a ring buffer of packed cells (y * cell_number + x), the head at head_index
+        self.ring = np.zeros((boards, self.cells), dtype=np.int64)
+        self.head_index = np.zeros(boards, dtype=np.int64)
+        self.length = np.zeros(boards, dtype=np.int64)
+        self.grid = np.zeros((boards, self.cells), dtype=np.uint8)  # 1 where a snake block is
+
+        self.direction = np.zeros(boards, dtype=np.int64)
+        self.new_block = np.zeros(boards, dtype=bool)  # grow on the next move
+        self.fruit = np.zeros(boards, dtype=np.int64)  # -1 once the board is full
+        self.score = np.zeros(boards, dtype=np.int64)
+        self.ticks = np.zeros(boards, dtype=np.int64)
+        self.done = np.zeros(boards, dtype=bool)
+        self.death = np.zeros(boards, dtype=np.int8)
+
+        # Results of the boards that finished during the last step (valid where self.finished)
+        self.finished = np.zeros(boards, dtype=bool)
+        self.final_score = np.zeros(boards, dtype=np.int64)
+        self.final_length = np.zeros(boards, dtype=np.int64)
+        self.final_ticks = np.zeros(boards, dtype=np.int64)
+        self.final_death = np.zeros(boards, dtype=np.int8)
+        self.games = 0  # games finished since the engine was created
+
+        self.reset()
+
+    def reset(self, boards=None):  # Start the given boards (all of them by default) from scratch
+        if boards is None:
+            boards = np.arange(self.boards)
+        if not len(boards):
+            return
+        row = self.cell_number // 2
+        self.grid[boards] = 0
+        for index, x in enumerate(reversed(engine.START_X)):  # tail, body, head
+            self.ring[boards, index] = row * self.cell_number + x
+            self.grid[boards, row * self.cell_number + x] = 1
+        self.head_index[boards] = 2
+        self.length[boards] = 3
+        self.direction[boards] = engine.RIGHT
+        self.new_block[boards] = False
+        self.score[boards] = 0
+        self.ticks[boards] = 0
+        self.done[boards] = False
+        self.death[boards] = ALIVE
+        self.randomize_fruit(boards)
+
+    def state(self):
+        heads = self.ring[np.arange(self.boards), self.head_index]
+        return engine.State(heads, self.fruit, self.direction, self.length, self.score, self.ticks)
+
+    def body(self, board):  # The packed cells of one board, head first (like engine.Engine.body)
+        indexes = (self.head_index[board] - np.arange(self.length[board])) % self.cells
+        return self.ring[board, indexes].tolist()
+
+    def randomize_fruit(self, boards):  # A uniformly random empty cell for every given board
+        free = self.cells - self.length[boards]
+        full = free == 0
+        if full.any():  # No empty cell left: those boards are won
+            self.fruit[boards[full]] = -1
+            self.done[boards[full]] = True
+            self.death[boards[full]] = FILLED
+            boards, free = boards[~full], free[~full]
+        if not len(boards):
+            return
+        # The k-th empty cell of every board, found with a running count of empty cells
+        wanted = (self.rng.random(len(boards)) * free).astype(np.int64)
+        empty_seen = np.cumsum(self.grid[boards] == 0, axis=1)
+        self.fruit[boards] = np.argmax(empty_seen > wanted[:, None], axis=1)
+
+    def step(self, actions=None):  # actions: one per board, -1 keeps the direction
+        rewards = np.zeros(self.boards, dtype=np.int64)
+        self.finished[:] = False
+        playing = np.flatnonzero(~self.done)
+
+        # Turn, unless Charlie would bite his own neck
+        direction = self.direction[playing]
+        if actions is not None:
+            action = np.asarray(actions, dtype=np.int64)[playing]
+            turn = (action >= 0) & (action != OPPOSITE[direction])
+            direction = np.where(turn, action, direction)
+            self.direction[playing] = direction
+        self.ticks[playing] += 1
+
+        # Where every head goes next
+        head = self.ring[playing, self.head_index[playing]]
+        head_x = head % self.cell_number + STEP_X[direction]
+        head_y = head // self.cell_number + STEP_Y[direction]
+        wall = (head_x < 0) | (head_x >= self.cell_number) | (head_y < 0) | (head_y >= self.cell_number)
+        new_head = np.where(wall, 0, head_y * self.cell_number + head_x)
+
+        # The tail moves out of the way unless Charlie is growing
+        tail_index = (self.head_index[playing] - self.length[playing] + 1) % self.cells
+        tail = self.ring[playing, tail_index]
+        growing = self.new_block[playing]
+        bite = ~wall & (self.grid[playing, new_head] == 1) & ((new_head != tail) | growing)
+
+        crashed = wall | bite
+        self.done[playing[crashed]] = True
+        self.death[playing[wall]] = WALL
+        self.death[playing[bite]] = SELF
+        rewards[playing[crashed]] = engine.DEATH_REWARD
+
+        # Move everybody who did not crash
+        moving = ~crashed
+        boards, new_head, tail, growing = playing[moving], new_head[moving], tail[moving], growing[moving]
+        self.grid[boards[~growing], tail[~growing]] = 0
+        self.length[boards[growing]] += 1
+        self.new_block[boards] = False
+        self.head_index[boards] = (self.head_index[boards] + 1) % self.cells
+        self.ring[boards, self.head_index[boards]] = new_head
+        self.grid[boards, new_head] = 1
+
+        # Eat the apple
+        eating = boards[new_head == self.fruit[boards]]
+        self.score[eating] += 1
+        self.new_block[eating] = True
+        rewards[eating] = engine.FRUIT_REWARD
+        self.randomize_fruit(eating)
+
+        # Remember how the finished games ended and start them again
+        finished = np.flatnonzero(self.done)
+        if self.auto_reset and len(finished):
+            self.finished[finished] = True
+            self.final_score[finished] = self.score[finished]
+            self.final_length[finished] = self.length[finished]
+            self.final_ticks[finished] = self.ticks[finished]
+            self.final_death[finished] = self.death[finished]
+            self.games += len(finished)
+            self.reset(finished)
+        return self.state(), rewards, self.finished.copy() if self.auto_reset else self.done.copy()
+
+    def results(self):  # The games that finished during the last step
+        return [Result(int(self.final_score[board]), int(self.final_length[board]),
+                       int(self.final_ticks[board]), engine.DEATHS[self.final_death[board]])
+                for board in np.flatnonzero(self.finished)]
+
+
+def check_against_engine(cell_number=engine.CELL_NUMBER, seed=0, steps=100000):
+    # Play the same games on one batched board and on engine.Engine and make sure they
+    # never disagree. The apples are copied from the batch, the only random part of a game.
+    batch = BatchEngine(1, cell_number, seed=seed, auto_reset=False)
+    scalar = engine.Engine(cell_number)
+    scalar.fruit = int(batch.fruit[0])
+    actions = np.random.default_rng(seed).integers(-1, 4, size=steps)
+    for tick, action in enumerate(actions):
+        _, scalar_reward, scalar_done = scalar.step(None if action < 0 else int(action))
+        _, rewards, done = batch.step([action])
+        if batch.fruit[0] >= 0:
+            scalar.fruit = int(batch.fruit[0])
+
+        if (list(scalar.body) != batch.body(0) or scalar.direction != batch.direction[0]
+                or scalar.score != batch.score[0] or scalar_reward != rewards[0]
+                or scalar_done != done[0] or scalar.death != engine.DEATHS[batch.death[0]]):
+            raise AssertionError(f"batch and engine disagree at step {tick} (seed {seed})")
+
+        if scalar_done:
+            batch.reset()
+            scalar.reset()
+            scalar.fruit = int(batch.fruit[0])
+    return steps
+
+
+def steps_per_second(boards, cell_number=engine.CELL_NUMBER, steps=1000):
+    batch = BatchEngine(boards, cell_number, seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(-1, 4, size=(steps, boards))
+    start = time.perf_counter()
+    for action in actions:
+        batch.step(action)
+    return boards * steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    check_against_engine()
+    print("Batch engine matches engine.Engine")
+
+    scalar = engine.Engine(seed=0)
+    start = time.perf_counter()
+    for _ in range(100000):
+        if scalar.step(None)[2]:
+            scalar.reset()
+    print(f"engine.Engine: {100000 / (time.perf_counter() - start):,.0f} steps/sec")
+    for batch_size in (1, 64, 1024, 8192):
+        print(f"BatchEngine x{batch_size}: {steps_per_second(batch_size):,.0f} steps/sec")
@@ -0,0 +1,210 @@
+# ------------------BENCHMARKS-----------------
+# Times the hot paths of the game (the engine rules, fruit placement and every draw
+# step) on boards from 20x20 to 500x500 with Charlie from 3 blocks long to filling the
+# whole board. Runs headless with SDL's dummy video and audio drivers.
+#
+#   python bench.py                               every board and length, printed
+#   python bench.py --boards 20 100 --out now.json
+#   python bench.py --baseline base.json          exit code 1 if anything got slower
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import pygame
+import engine
+import main
+from audio import AUDIO
+# ---------------------------------------------
+
+BOARDS = (20, 50, 100, 200, 500)
+LENGTHS = (0.0, 0.1, 0.5, 1.0)  # Charlie's length as a fraction of the board (0: the starting 3 blocks)
+MIN_TIME = 0.2  # Seconds every benchmark runs for (at least one call)
+REPEATS = 5  # The benchmark is timed this many times and the fastest run is kept
+THRESHOLD = 0.20  # Slower than the baseline by more than this is a regression
+
+
+def cycle(cell_number):  # A path through every cell of the board that ends next to where it starts
+    path = []
+    for y in range(cell_number):  # snake through columns 1.. row by row
+        columns = range(1, cell_number) if y % 2 == 0 else range(cell_number - 1, 0, -1)
+        path += [y * cell_number + x for x in columns]
+    path += [y * cell_number for y in range(cell_number - 1, -1, -1)]  # and back up column 0
+    return path
+
+
+def board_with_snake(cell_number, length, seed=0):
+    # An engine with Charlie `length` blocks long, lying on the cycle and heading along it,
+    # so he can keep moving forever (even when he fills the whole board)
+    game = engine.Engine(cell_number, seed)
+    path = cycle(cell_number)
+    game.place_body(path[length - 1::-1])
+    head_x, head_y = game.xy(path[length - 1])
+    next_x, next_y = game.xy(path[length % len(path)])
+    game.direction = engine.DIRECTIONS.index((next_x - head_x, next_y - head_y))
+    game.randomize_fruit()
+    game.done = False  # A full board is not a finished game for the benchmark
+    return game, path
+
+
+def follow_cycle(game, path, position):  # The action that keeps Charlie on the cycle
+    head_x, head_y = game.xy(path[position % len(path)])
+    next_x, next_y = game.xy(path[(position + 1) % len(path)])
+    return engine.DIRECTIONS.index((next_x - head_x, next_y - head_y))
+
+
+def measure(function, min_time=MIN_TIME, repeats=REPEATS):  # Microseconds per call (fastest run)
+    calls = 1
+    while True:  # How many calls take long enough to time
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        took = time.perf_counter() - start
+        if took >= min_time / repeats or calls >= 1 << 20:
+            break
+        calls *= 2 if took == 0 else max(2, min(10, int(min_time / repeats / took) + 1))
+    runs = [took]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        runs.append(time.perf_counter() - start)
+    return 1e6 * min(runs) / calls, 1e6 * statistics.median(runs) / calls
+
+
+def engine_benchmarks(cell_number, length):
+    # Every benchmark gets a board of its own, so none of them can change what another one times
+    def moving(advance):  # Charlie going round the cycle, one call per move
+        game, path = board_with_snake(cell_number, length)
+        game.fruit = None  # No apple on his way, so he stays `length` blocks long however long it runs
+        position = [length - 1]  # where the head is on the cycle
+
+        def call():
+            advance(game, follow_cycle(game, path, position[0]))
+            position[0] += 1
+        return call
+
+    def move(game, action):
+        game.direction = action
+        game.move()
+
+    def step(game, action):
+        game.step(action)
+
+    def fruit_placement():
+        game, _ = board_with_snake(cell_number, length)
+
+        def call():
+            game.randomize_fruit()
+            game.done = False  # Placing an apple on a full board finishes the game, keep it going
+            game.death = None
+        return call
+
+    return {
+        "Snake.move": moving(move),
+        "Game.check_failure": board_with_snake(cell_number, length)[0].check_failure,
+        "Game.eat_fruit": board_with_snake(cell_number, length)[0].eat_fruit,
+        "fruit placement": fruit_placement(),
+        "engine step": moving(step),
+    }
+
+
+def render_benchmarks(cell_number, length):
+    main.configure_board(cell_number, main.fit_cell_size(cell_number))
+    game_engine, path = board_with_snake(cell_number, length)
+    game = main.Game(game_engine)
+    game.draw()  # builds the level surface and the snake images once
+    position = [length - 1]
+
+    def full_frame():
+        game.draw()
+        pygame.display.update()
+
+    def dirty_frame():
+        game_engine.step(follow_cycle(game_engine, path, position[0]))
+        position[0] += 1
+        dirty_rects = game.draw_changes()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+
+    return {
+        "draw_level": main.draw_level,
+        "Snake.draw": game.Snake.draw,
+        "Game.draw_score": game.draw_score,
+        "full frame": full_frame,
+        "dirty frame": dirty_frame,
+    }
+
+
+def run(boards=BOARDS, lengths=LENGTHS, render=True, min_time=MIN_TIME, report=print):
+    AUDIO.disable()
+    main.init_display()
+    results = {}
+    for cell_number in boards:
+        for fraction in lengths:
+            length = max(3, round(fraction * cell_number * cell_number))
+            suites = [engine_benchmarks]
+            if render:
+                suites.append(render_benchmarks)
+            for suite in suites:
+                for name, function in suite(cell_number, length).items():
+                    best, median = measure(function, min_time)
+                    key = f"{name} @ {cell_number}x{cell_number}, length {length}"
+                    results[key] = {"name": name, "board": cell_number, "length": length,
+                                    "best_us": best, "median_us": median}
+                    report(f"{key:<60} {best:12.2f} us")
+    return results
+
+
+def regressions(results, baseline, threshold=THRESHOLD):  # Benchmarks slower than the baseline
+    slower = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is not None and result["best_us"] > before["best_us"] * (1 + threshold):
+            slower.append((key, before["best_us"], result["best_us"]))
+    return slower
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Hungry Charlie hot paths.")
+    parser.add_argument("--boards", type=int, nargs="+", default=BOARDS, help="cells per side (even numbers)")
+    parser.add_argument("--lengths", type=float, nargs="+", default=LENGTHS,
+                        help="Charlie's length as a fraction of the board")
+    parser.add_argument("--no-render", action="store_true", help="only the engine benchmarks")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per benchmark")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved earlier with --out")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if any(cell_number % 2 for cell_number in args.boards):
+        parser.error("board sizes must be even")
+
+    results = run(args.boards, args.lengths, not args.no_render, args.min_time)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump({
+                "python": platform.python_version(),
+                "pygame": pygame.version.ver,
+                "machine": platform.platform(),
+                "results": results,
+            }, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        slower = regressions(results, baseline, args.threshold)
+        for key, before, now in slower:
+            print(f"REGRESSION {key}: {before:.2f} us -> {now:.2f} us ({now / before - 1:+.0%})")
+        if slower:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,84 @@
+# ------------------GAME CLIENT-----------------
+# Watches (or plays) a game served by server.py. The client keeps its own engine.Engine
+# and plays every delta the server sends on it, so the game window draws it with the
+# usual Snake and Fruit classes and repaints only the cells that changed.
+#
+#   python client.py                         watch the game on this machine
+#   python client.py --host 192.168.1.7      watch a game on the LAN
+#   python client.py --play                  steer Charlie with the arrow keys
+import argparse
+import asyncio
+import sys
+import pygame
+import engine
+import main as window
+import server
+# ----------------------------------------------
+
+ARROWS = {pygame.K_UP: engine.UP, pygame.K_DOWN: engine.DOWN, pygame.K_RIGHT: engine.RIGHT, pygame.K_LEFT: engine.LEFT}
+
+
+async def receive(reader, game):  # Play the server's game on the client's engine as it arrives
+    while True:
+        kind, fields, body = await server.read_message(reader)
+        if kind == server.SNAPSHOT:
+            server.apply_snapshot(game.engine, fields, body)
+            game.full_draw = True
+        else:
+            server.apply_delta(game.engine, fields)
+            if game.engine.ate:
+                game.Snake.crunch()
+
+
+async def show(game, writer, play):  # The window: draws what changed, sends the arrows when playing
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.WINDOWEXPOSED:
+                game.full_draw = True
+            if play and event.type == pygame.KEYDOWN and event.key in ARROWS:
+                writer.write(bytes([ARROWS[event.key]]))
+
+        dirty_rects = game.draw_changes()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        await asyncio.sleep(1 / window.FRAMERATE)
+
+
+async def watch(host=server.HOST, port=server.PORT, play=False, skin=1):
+    reader, writer = await asyncio.open_connection(host, port)
+    kind, fields, body = await server.read_message(reader)  # The server always starts with a snapshot
+    cell_number = fields[1]
+    window.configure_board(cell_number, window.fit_cell_size(cell_number))
+    window.init_display()
+    game_engine = engine.Engine(cell_number)
+    server.apply_snapshot(game_engine, fields, body)
+    game = window.Game(game_engine, skin=skin)
+
+    receiver = asyncio.create_task(receive(reader, game))
+    shower = asyncio.create_task(show(game, writer, play))
+    try:  # Until the window is closed or the server goes away
+        await asyncio.wait([receiver, shower], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        receiver.cancel()
+        shower.cancel()
+        writer.close()
+    if receiver.done() and not receiver.cancelled() and receiver.exception() is not None:
+        print("Lost the server:", receiver.exception())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch or play a Hungry Charlie game served by server.py.")
+    parser.add_argument("--host", default=server.HOST)
+    parser.add_argument("--port", type=int, default=server.PORT)
+    parser.add_argument("--play", action="store_true", help="send the arrow keys to the server")
+    parser.add_argument("--skin", type=int, default=1, choices=(1, 2, 3))
+    args = parser.parse_args(argv)
+    asyncio.run(watch(args.host, args.port, args.play, args.skin))
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# ------------------HEADLESS SIMULATION ENGINE------------------
+# The rules of Hungry Charlie without pygame: no window, no mixer and no timer.
+# main.py only draws what this engine says is happening, so bots and regression
+# tests can play as many games as they want by calling step() in a loop.
+import random
+from array import array
+from collections import deque, namedtuple
+# --------------------------------------------------------------
+
+CELL_NUMBER = 20  # The board has CELL_NUMBER x CELL_NUMBER cells
+START_X = (5, 4, 3)  # Charlie starts in the middle row: head, body, tail
+MIN_CELL_NUMBER = START_X[0] + 2  # Smallest board with Charlie on it and one cell in front of him
+
+# Actions accepted by Engine.step (None means "keep going the same way")
+UP = 0
+DOWN = 1
+RIGHT = 2
+LEFT = 3
+DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0))  # (x, y) step for every action
+OPPOSITE = (DOWN, UP, LEFT, RIGHT)  # Charlie can never turn straight back into his neck
+
+# Why did the game end?
+HIT_WALL = "hit the wall"
+BIT_HIMSELF = "bit himself"
+FILLED_BOARD = "filled the board"  # There is no empty cell left for an apple: Charlie wins
+DEATHS = (None, HIT_WALL, BIT_HIMSELF, FILLED_BOARD)  # Every ending by number, for files and arrays (0: still playing)
+
+# Rewards returned by step()
+FRUIT_REWARD = 1
+DEATH_REWARD = -1
+
+# What step() hands back to the caller after every tick (head and fruit are packed cells, see Engine.cell)
+State = namedtuple("State", ["head", "fruit", "direction", "length", "score", "ticks"])
+
+
+def check_cell_number(cell_number):  # Charlie's starting cells would wrap into other rows on a smaller board
+    if cell_number < MIN_CELL_NUMBER:
+        raise ValueError(f"A board has at least {MIN_CELL_NUMBER}x{MIN_CELL_NUMBER} cells, "
+                         f"not {cell_number}x{cell_number}")
+
+
+# Every empty cell of the board, kept in an array that shrinks and grows as the snake moves.
+# Removing a cell swaps it with the last empty one, so taking or giving back a cell and
+# picking a random empty cell are all O(1) no matter how long Charlie is.
+class FreeCells:
+    def __init__(self, size):
+        self.cells = array('l', range(size))  # cells[:count] are the empty cells
+        self.index = array('l', range(size))  # where every cell sits inside self.cells
+        self.count = size
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):  # Every cell empty, in the same order as a new FreeCells (so games replay exactly)
+        self.cells[:] = array('l', range(len(self.cells)))
+        self.index[:] = self.cells
+        self.count = len(self.cells)
+
+    def __contains__(self, cell):
+        return self.index[cell] < self.count
+
+    def remove(self, cell):  # The cell is not empty anymore
+        position = self.index[cell]
+        self.count -= 1
+        last = self.cells[self.count]
+        self.cells[position] = last
+        self.index[last] = position
+        self.cells[self.count] = cell
+        self.index[cell] = self.count
+
+    def add(self, cell):  # The cell is empty again
+        position = self.index[cell]
+        first_taken = self.cells[self.count]
+        self.cells[position] = first_taken
+        self.index[first_taken] = position
+        self.cells[self.count] = cell
+        self.index[cell] = self.count
+        self.count += 1
+
+    def choice(self, rng):  # A uniformly random empty cell (None when the board is full)
+        if not self.count:
+            return None
+        return self.cells[rng.randrange(self.count)]
+
+
+# Cells are packed into a single int (y * cell_number + x) so the body is a deque of ints
+# and "is there a snake block here?" is one lookup in a bytearray instead of a scan of the body
+class Engine:
+    def __init__(self, cell_number=CELL_NUMBER, seed=None):
+        check_cell_number(cell_number)  # Fail now if Charlie does not fit on the board
+        self.cell_number = cell_number
+        self.rng = random.Random()  # every game owns its RNG so runs are reproducible from the seed
+        self.seed = None
+        self.body = deque()  # packed cells, the head is body[0] and the tail body[-1]
+        self.grid = bytearray(cell_number * cell_number)  # 1 where a snake block is
+        self.owner = 1  # What the grid holds where Charlie is (an arena grid holds one number per snake)
+        self.moves = 0  # Counts the moves, and jumps when Charlie is put down somewhere new
+        self.free = FreeCells(cell_number * cell_number)  # every cell without a snake block
+        self.steps = tuple(dx + dy * cell_number for dx, dy in DIRECTIONS)  # packed step for every action
+        self.direction = RIGHT
+        self.new_block = False  # Does Charlie need to grow on the next move?
+        self.fruit = None  # packed cell of the apple
+        self.score = 0
+        self.ticks = 0
+        self.done = False
+        self.death = None  # HIT_WALL, BIT_HIMSELF or FILLED_BOARD once the game is over
+        self.ate = False  # Did Charlie eat during the last step? (the front-end plays a sound)
+        self.vacated = None  # The cell the tail left during the last step (None if Charlie grew or crashed)
+        self.reset(seed)
+
+    def cell(self, x, y):  # (x, y) -> packed cell
+        return y * self.cell_number + x
+
+    def xy(self, cell):  # packed cell -> (x, y)
+        y, x = divmod(cell, self.cell_number)
+        return x, y
+
+    def reset(self, seed=None):
+        if seed is None:  # Every game gets a seed, so any game can be replayed
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng.seed(seed)
+        for block in self.body:
+            self.grid[block] = 0
+        self.body.clear()
+        self.free.reset()
+        row = self.cell_number // 2
+        self.place_body([self.cell(x, row) for x in START_X])
+        self.direction = RIGHT
+        self.new_block = False
+        self.score = 0
+        self.ticks = 0
+        self.done = False
+        self.death = None
+        self.ate = False
+        self.vacated = None
+        self.randomize_fruit()
+        return self.state()
+
+    def place_body(self, cells):  # Put Charlie on the given cells (head first), wherever he was before
+        for block in self.body:
+            self.vacate(block)
+        self.body.clear()
+        for block in cells:
+            self.body.append(block)
+            self.occupy(block)
+        self.count_placement()
+
+    def count_placement(self):  # Charlie was put down somewhere new
+        # The move counter jumps further than any single move could, so whoever follows
+        # Charlie move by move (the renderer) can tell he did not just crawl there
+        self.moves += len(self.body) + 1
+
+    def snapshot(self):  # Everything needed to continue the game later from exactly this tick
+        # The order of the free cells decides where the next apples go, so it is saved too
+        return (tuple(self.body), self.free.cells[:], self.free.count, self.direction, self.new_block,
+                self.fruit, self.score, self.ticks, self.done, self.death, self.ate, self.vacated,
+                self.seed, self.rng.getstate())
+
+    def restore(self, snapshot):  # Go back to a snapshot() of this engine
+        (body, free_cells, self.free.count, self.direction, self.new_block, self.fruit, self.score,
+         self.ticks, self.done, self.death, self.ate, self.vacated, self.seed, rng_state) = snapshot
+        for block in self.body:
+            self.grid[block] = 0
+        self.body.clear()
+        self.body.extend(body)
+        for block in body:
+            self.grid[block] = 1
+        self.count_placement()
+        self.free.cells[:] = free_cells
+        for position, cell in enumerate(free_cells):
+            self.free.index[cell] = position
+        self.rng.setstate(rng_state)
+
+    def occupy(self, cell):  # A snake block moves into the cell
+        self.grid[cell] = 1
+        self.free.remove(cell)
+
+    def vacate(self, cell):  # A snake block leaves the cell
+        self.grid[cell] = 0
+        self.free.add(cell)
+
+    def state(self):
+        return State(self.body[0], self.fruit, self.direction, len(self.body), self.score, self.ticks)
+
+    def turn(self, action):  # Change direction unless Charlie would bite his own neck
+        if action is not None and action != OPPOSITE[self.direction]:
+            self.direction = action
+
+    def step(self, action=None):
+        if self.done:  # A finished game stays finished until reset()
+            return self.state(), 0, True
+
+        self.turn(action)
+        self.ate = False
+        self.vacated = None
+        self.ticks += 1
+        if self.check_failure():  # The body is left where it was when Charlie crashed
+            self.done = True
+            return self.state(), DEATH_REWARD, True
+
+        self.move()
+        self.eat_fruit()
+        return self.state(), FRUIT_REWARD if self.ate else 0, self.done
+
+    def check_failure(self):  # Would the next move kill Charlie?
+        head_x, head_y = self.xy(self.body[0])
+        step_x, step_y = DIRECTIONS[self.direction]
+        head_x += step_x
+        head_y += step_y
+
+        # The snake hits the wall
+        if not (0 <= head_x < self.cell_number and 0 <= head_y < self.cell_number):
+            self.death = HIT_WALL
+            return True
+
+        # The snake eats itself (the tail moves out of the way unless Charlie is growing)
+        new_head = self.body[0] + self.steps[self.direction]
+        if self.grid[new_head] and (new_head != self.body[-1] or self.new_block):
+            self.death = BIT_HIMSELF
+            return True
+        return False
+
+    def move(self):
+        if self.new_block:  # Grow: keep the tail where it is
+            self.new_block = False
+        else:
+            self.vacated = self.body.pop()
+            self.vacate(self.vacated)
+        new_head = self.body[0] + self.steps[self.direction]
+        self.body.appendleft(new_head)
+        self.occupy(new_head)
+        self.moves += 1
+
+    def randomize_fruit(self):  # The next apple goes to a random empty cell, never onto Charlie
+        self.fruit = self.free.choice(self.rng)
+        if self.fruit is None:  # No empty cell left: the board is full and Charlie wins
+            self.done = True
+            self.death = FILLED_BOARD
+
+    def eat_fruit(self):
+        if self.fruit == self.body[0]:  # If the snake bites the fruit
+            self.randomize_fruit()  # new fruit
+            self.new_block = True  # snake grows
+            self.ate = True
+            self.score += 1
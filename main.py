@@ -1,25 +1,109 @@
 # ------------------LIBRARIES USED FOR OUR GAME-----------------
+import time
+START_TIME = time.perf_counter()  # Startup is timed from here, before pygame is imported
+import argparse
+import atexit
+import os
 import pygame
 import sys
-import random
+from collections import deque
+from itertools import islice
 from enum import Enum
 from pygame.math import Vector2
+import arena
+import engine
+import replay
+from assets import ASSETS, SKIN_PARTS, SKINS
+from audio import AUDIO
+from textcache import TEXT
+from profiler import PROFILER
 # --------------------------------------------------------------
 
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()  # Initialize pygame to run the game
-pygame.font.init()  # Initialize font to add our .ttf file
-pygame.display.set_caption('Hungry Charlie')  # Name displayed to the top left of the window
-
 CELL_SIZE = 40
-CELL_NUMBER = 20
-TEXT_FONT = pygame.font.Font("Fonts/ARCADE_R.TTF", 25)  # Set our own font to display text
-# The window's size will be 800x800
-SCREEN = pygame.display.set_mode((CELL_NUMBER * CELL_SIZE, CELL_NUMBER * CELL_SIZE))
-CLOCK = pygame.time.Clock()
+CELL_NUMBER = engine.CELL_NUMBER
+MAX_CELL_SIZE = CELL_SIZE  # The size the sprites are drawn for, fitted cells never get bigger
+MIN_CELL_SIZE = 2
+FIT_WINDOW_SIZE = 800  # Cells get smaller on big boards so the window stays about this size
 FRAMERATE = 60  # 60 frames per second (fps)
-SCREEN_UPDATE = pygame.USEREVENT  # keep track of updates in our game
-pygame.time.set_timer(SCREEN_UPDATE, 140)  # every update has 140 millisecond gap
+
+# The game moves in fixed ticks, counted from the real time between frames
+TICK_MS = 140  # every update has 140 millisecond gap
+MIN_TICK_MS = 70  # Charlie never gets faster than this
+SPEEDUP_MS = 0  # How many milliseconds every apple takes off the tick (0 keeps the speed constant)
+MAX_TICKS_PER_FRAME = 5  # After a long stall the missed ticks beyond this are dropped, not replayed
+INPUT_BUFFER = 3  # Key presses waiting for a tick (one direction change is used per tick)
+SMOOTH_MOVEMENT = False  # Slide the head and tail between cells (repaints the whole window every frame)
+
+PROFILE_PATH = None  # Where the frame timings are written when the game closes (set by --profile)
+OVERLAY_REFRESH_MS = 500  # How often the frame time overlay (F3) shows new numbers
+OVERLAY_FONT_SIZE = 12
+
+# Large boards: the window shows VIEW_CELLS x VIEW_CELLS cells and a camera follows Charlie's head
+VIEW_CELLS = None  # None shows the whole board
+CAMERA_MARGIN = 4  # The camera moves when the head gets this close to the edge of the window
+CAMERA_X = 0  # Board cell shown in the top left corner of the window
+CAMERA_Y = 0
+
+# Filled in by init_display(), so importing this module never opens a window
+SCREEN = None
+CLOCK = None
+SCORE_FONT_SIZE = 25
+GAME_FONT_SIZES = (SCORE_FONT_SIZE, 45, 40, 30)  # The score and the game over screen, opened while the menu is shown
+
+
+def configure_board(cell_number, cell_size, view_cells=None):  # Change the board and cell size (before the window opens, or after)
+    global CELL_NUMBER, CELL_SIZE, VIEW_CELLS, SCREEN
+    CELL_NUMBER = cell_number
+    CELL_SIZE = cell_size
+    VIEW_CELLS = view_cells
+    if SCREEN is not None:
+        SCREEN = pygame.display.set_mode((window_size(), window_size()))
+
+
+def fit_cell_size(cell_number, window_px=FIT_WINDOW_SIZE):  # Biggest cell that fits cell_number cells into window_px
+    return max(MIN_CELL_SIZE, min(MAX_CELL_SIZE, window_px // cell_number))
+
+
+def view_cells():  # How many cells the window shows on each side
+    return min(CELL_NUMBER, VIEW_CELLS or CELL_NUMBER)
+
+
+def window_size():  # Width (and height) of the window in pixels
+    return view_cells() * CELL_SIZE
+
+
+def move_camera(head, center=False):  # Keep the head inside the window, True if the camera moved
+    global CAMERA_X, CAMERA_Y
+    view = view_cells()
+    head_y, head_x = divmod(head, CELL_NUMBER)
+    camera_x, camera_y = CAMERA_X, CAMERA_Y
+    margin = min(CAMERA_MARGIN, (view - 1) // 2)
+    if center or not camera_x + margin <= head_x < camera_x + view - margin:
+        camera_x = head_x - view // 2
+    if center or not camera_y + margin <= head_y < camera_y + view - margin:
+        camera_y = head_y - view // 2
+    camera_x = max(0, min(camera_x, CELL_NUMBER - view))
+    camera_y = max(0, min(camera_y, CELL_NUMBER - view))
+    moved = (camera_x, camera_y) != (CAMERA_X, CAMERA_Y)
+    CAMERA_X, CAMERA_Y = camera_x, camera_y
+    return moved
+
+
+def init_display():  # Start pygame and open the 800x800 window
+    global SCREEN, CLOCK
+    # Only what the first frame needs: the mixer is opened by AUDIO (on its preloader or the first sound)
+    pygame.display.init()
+    pygame.font.init()  # Initialize font to add our .ttf file
+    pygame.display.set_caption('Hungry Charlie')  # Name displayed to the top left of the window
+
+    # The window's size will be 800x800
+    SCREEN = pygame.display.set_mode((window_size(), window_size()))
+    CLOCK = pygame.time.Clock()
+
+
+def cell_rect(cell):  # The window area of a packed engine cell
+    y, x = divmod(cell, CELL_NUMBER)
+    return pygame.Rect((x - CAMERA_X) * CELL_SIZE, (y - CAMERA_Y) * CELL_SIZE, CELL_SIZE, CELL_SIZE)
 
 
 # The Color class keeps all colors with their RGB values
@@ -32,36 +116,57 @@ class Color(Enum):
     Black = (0, 0, 0)
 
 
-# The Fruit class represents the apple eaten by Charlie the Snake.
-# When the snake eats the apple we add +1 to our total score and the snake grows larger
+# The Fruit class draws the apple eaten by Charlie the Snake.
+# Where the apple is comes from the engine, this class only knows how it looks
 class Fruit:
-    def __init__(self):
-        self.pos = None  # Vector2 position of the fruit (randomized every time)
-        self.y = None  # y position
-        self.x = None  # x position
-        self.image = pygame.image.load('Images/apple.png').convert_alpha()  # image used for the apple (40x40)
-        self.randomize_position()  # at every initialization, we randomize the position of the next fruit
+    def __init__(self, game_engine):
+        self.engine = game_engine
+        self.image = ASSETS.image('apple', CELL_SIZE)  # image used for the apple (40x40)
+
+    @property
+    def pos(self):  # Vector2 position of the fruit (randomized by the engine)
+        return Vector2(self.engine.xy(self.engine.fruit))
 
     def draw(self):  # How we draw the apple image to out object
+        if self.engine.fruit is None:  # Charlie filled the whole board, there is no apple left
+            return
         # We make sure the apple is drawn inside one of the screen's cells with exact integer coordinates
-        fruit_rect = pygame.Rect(int(self.pos.x * CELL_SIZE), int(self.pos.y * CELL_SIZE), CELL_SIZE, CELL_SIZE)
-        SCREEN.blit(self.image, fruit_rect)
-
-    # When Charlie eats a fruit, the next one must be to another, random position
-    def randomize_position(self):
-        self.x = random.randint(0, CELL_NUMBER - 1)
-        self.y = random.randint(0, CELL_NUMBER - 1)
-        self.pos = Vector2(self.x, self.y)
+        SCREEN.blit(self.image, cell_rect(self.engine.fruit))
+
+
+def body_part(previous_block, next_block):  # Image of a block between the head and the tail
+    # previous_block and next_block are where the blocks on the tail and on the head side are (x, y)
+    # We make sure to keep track the direction of each block so that we can put the correct image
+    if previous_block[0] == next_block[0]:
+        return "body_vertical"
+    elif previous_block[1] == next_block[1]:
+        return "body_horizontal"
+    elif previous_block[0] == -1 and next_block[1] == -1 or previous_block[1] == -1 and next_block[0] == -1:
+        return "body_tl"
+    elif previous_block[0] == -1 and next_block[1] == 1 or previous_block[1] == 1 and next_block[0] == -1:
+        return "body_bl"
+    elif previous_block[0] == 1 and next_block[1] == -1 or previous_block[1] == -1 and next_block[0] == 1:
+        return "body_tr"
+    else:
+        return "body_br"
+
+
+# Sprite IDs: the image of every block as an index into SKIN_PARTS. A block only looks different
+# when the blocks next to it move, so its sprite is looked up in these tables (by engine action)
+# once, when it becomes the head, the neck or the tail, instead of being worked out every frame.
+HEAD_SPRITES = tuple(SKIN_PARTS.index(part) for part in ("head_up", "head_down", "head_right", "head_left"))
+TAIL_SPRITES = tuple(SKIN_PARTS.index(part) for part in ("tail_down", "tail_up", "tail_left", "tail_right"))
+BODY_SPRITES = tuple(SKIN_PARTS.index(body_part((-into_x, -into_y), out))  # [move into the block * 4 + move out]
+                     for into_x, into_y in engine.DIRECTIONS for out in engine.DIRECTIONS)
+NO_SPRITE = 255  # The body sprite of the cell is not known
 
 
 # Charlie is a hungry snake who likes to eat healthy :)
+# The engine moves him around, this class draws him and plays his sounds
 class Snake:
-    def __init__(self):
-        # The body of the snake is in total 3 vectors (head, body, tail) to specific locations
-        self.body = [Vector2(5, 10), Vector2(4, 10), Vector2(3, 10)]
-        self.direction = Vector2(1, 0)  # The snake has by default RIGHT direction
-        self.new_block = False  # Does Charlie need to grow?
-        self.skin = 0  # Skin selected from the menu (1, 2 or 3)
+    def __init__(self, game_engine, skin=1):
+        self.engine = game_engine
+        self.skin = skin  # Skin selected from the menu (1, 2 or 3)
 
         # Images for all snake's vectors
         # The image's paths are found from the Images folder
@@ -84,116 +189,149 @@ class Snake:
         self.body_br = None
         self.body_bl = None
 
-        self.crunch_sound = pygame.mixer.Sound('Sounds/crunch.wav')  # How Charlie eating sounds like?
-        self.hit_sound = pygame.mixer.Sound('Sounds/hit.wav')  # How Charlie being hit sounds like?
-        self.load_skin(1)  # Default skin of the snake is the first one
+        self.sprite_images = []  # The same images by sprite ID
+
+        cell_count = game_engine.cell_number * game_engine.cell_number
+        self.sprites = bytearray([NO_SPRITE]) * cell_count  # Sprite ID of every block of the body, by cell
+        self.actions = {step: action for action, step in enumerate(game_engine.steps)}  # packed step -> action
+        self.synced_moves = None  # engine.moves when the sprites were last brought up to date
+        self.synced_tail = None
+        self.load_skin(skin)  # Default skin of the snake is the first one
 
     def load_skin(self, skin_selection):  # Function to load the correct skin from the menu
-        base_path = f"Images/Skin_{skin_selection}/"  # The images' names are the same
-        # The only difference comes to the file located (Skin_1, Skin_2, Skin_3)
+        # The images come from the shared asset cache, so only the first use of a skin reads the disk
+        parts = ASSETS.skin(skin_selection, CELL_SIZE)
 
-        self.head_up = pygame.image.load(base_path + "head_up.png").convert_alpha()
-        self.head_down = pygame.image.load(base_path + "head_down.png").convert_alpha()
-        self.head_right = pygame.image.load(base_path + "head_right.png").convert_alpha()
-        self.head_left = pygame.image.load(base_path + "head_left.png").convert_alpha()
+        self.head_up = parts["head_up"]
+        self.head_down = parts["head_down"]
+        self.head_right = parts["head_right"]
+        self.head_left = parts["head_left"]
 
-        self.tail_up = pygame.image.load(base_path + "tail_up.png").convert_alpha()
-        self.tail_down = pygame.image.load(base_path + "tail_down.png").convert_alpha()
-        self.tail_right = pygame.image.load(base_path + "tail_right.png").convert_alpha()
-        self.tail_left = pygame.image.load(base_path + "tail_left.png").convert_alpha()
+        self.tail_up = parts["tail_up"]
+        self.tail_down = parts["tail_down"]
+        self.tail_right = parts["tail_right"]
+        self.tail_left = parts["tail_left"]
 
-        self.body_vertical = pygame.image.load(base_path + "body_vertical.png").convert_alpha()
-        self.body_horizontal = pygame.image.load(base_path + "body_horizontal.png").convert_alpha()
+        self.body_vertical = parts["body_vertical"]
+        self.body_horizontal = parts["body_horizontal"]
 
-        self.body_tr = pygame.image.load(base_path + "body_tr.png").convert_alpha()
-        self.body_tl = pygame.image.load(base_path + "body_tl.png").convert_alpha()
-        self.body_br = pygame.image.load(base_path + "body_br.png").convert_alpha()
-        self.body_bl = pygame.image.load(base_path + "body_bl.png").convert_alpha()
+        self.body_tr = parts["body_tr"]
+        self.body_tl = parts["body_tl"]
+        self.body_br = parts["body_br"]
+        self.body_bl = parts["body_bl"]
+
+        self.sprite_images = [parts[part] for part in SKIN_PARTS]
 
         self.head = self.head_up  # default value to avoid None value related errors
         self.tail = self.tail_up  # default value to avoid None value related errors
 
-    def draw(self):
-        self.update_head()  # keep track of the correct image of the head
-        self.update_tail()  # keep track of the correct image of the tail
-
-        # For each block in the snake's body we check which image is proper
-        for index, block in enumerate(self.body):
-            x_pos = int(block.x * CELL_SIZE)
-            y_pos = int(block.y * CELL_SIZE)
-            block_rect = pygame.Rect(x_pos, y_pos, CELL_SIZE, CELL_SIZE)
-
-            if index == 0:  # The first block is the head
-                SCREEN.blit(self.head, block_rect)
-            elif index == len(self.body) - 1:  # The last one is the tail
-                SCREEN.blit(self.tail, block_rect)
-            else:  # In between, the rest of the body
-                previous_block = self.body[index + 1] - block
-                next_block = self.body[index - 1] - block
-
-                # We make sure to keep track the direction of each block so that we can put the correct image
-                if previous_block.x == next_block.x:
-                    SCREEN.blit(self.body_vertical, block_rect)
-                elif previous_block.y == next_block.y:
-                    SCREEN.blit(self.body_horizontal, block_rect)
-                else:
-                    if previous_block.x == -1 and next_block.y == -1 or previous_block.y == -1 and next_block.x == -1:
-                        SCREEN.blit(self.body_tl, block_rect)
-                    if previous_block.x == -1 and next_block.y == 1 or previous_block.y == 1 and next_block.x == -1:
-                        SCREEN.blit(self.body_bl, block_rect)
-                    if previous_block.x == 1 and next_block.y == -1 or previous_block.y == -1 and next_block.x == 1:
-                        SCREEN.blit(self.body_tr, block_rect)
-                    if previous_block.x == 1 and next_block.y == 1 or previous_block.y == 1 and next_block.x == 1:
-                        SCREEN.blit(self.body_br, block_rect)
-
-    def update_head(self):  # How the head will look (based on direction)
-        head_direction = self.body[1] - self.body[0]
-        if head_direction == Vector2(1, 0):
-            self.head = self.head_left  # LEFT
-        elif head_direction == Vector2(-1, 0):
-            self.head = self.head_right  # RIGHT
-        elif head_direction == Vector2(0, 1):
-            self.head = self.head_up  # UP
-        elif head_direction == Vector2(0, -1):
-            self.head = self.head_down  # DOWN
-
-    def update_tail(self):  # How the tail will look (based on direction)
-        tail_direction = self.body[-2] - self.body[-1]
-        if tail_direction == Vector2(1, 0):
-            self.tail = self.tail_left  # LEFT
-        elif tail_direction == Vector2(-1, 0):
-            self.tail = self.tail_right  # RIGHT
-        elif tail_direction == Vector2(0, 1):
-            self.tail = self.tail_up  # UP
-        elif tail_direction == Vector2(0, -1):
-            self.tail = self.tail_down  # DOWN
-
-    def move(self):
-        if self.new_block:  # If the snake requires a new block
-            body_copy = self.body[:]
-            body_copy.insert(0, body_copy[0] + self.direction)  # we add a new block
-            self.body = body_copy[:]
-            self.new_block = False
-        else:  # The snake keeps moving we just adjust the Vector2 blocks
-            body_copy = self.body[:-1]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-
-    def add_block(self):  # Does the snake need a new block?
-        self.new_block = True
+    def draw(self):  # Draw the blocks inside the window in one batch
+        self.sync()
+        sprite_images, sprites = self.sprite_images, self.sprites
+        head, tail = self.engine.body[0], self.engine.body[-1]
+        blits = []
+        for cell in self.visible_cells():
+            if cell == head:
+                image = self.head
+            elif cell == tail:
+                image = self.tail
+            else:  # In between, the sprite the block got when it was the neck
+                image = sprite_images[sprites[cell]]
+            blits.append((image, cell_rect(cell)))
+        SCREEN.blits(blits, doreturn=False)
+
+    def visible_cells(self):  # The cells of the body inside the window
+        # They are found row by row in the board grid, so this costs the same
+        # however big the board is and however long Charlie is
+        grid = self.engine.grid
+        owner = self.engine.owner  # In an arena the grid holds the number of the snake in every cell
+        view = view_cells()
+        for row in range(CAMERA_Y, CAMERA_Y + view):
+            row_end = row * CELL_NUMBER + CAMERA_X + view
+            cell = grid.find(owner, row * CELL_NUMBER + CAMERA_X, row_end)
+            while cell != -1:
+                yield cell
+                cell = grid.find(owner, cell + 1, row_end)
+
+    def sync(self):  # Give the blocks that moved their sprites, return the cells that look different now
+        # After a move only the new head, the neck (the old head) and the tail look different, the rest
+        # of the body keeps the sprite it got when it was the neck. If Charlie was put down somewhere
+        # new (a new game, a replay seek) every block gets its sprite again and None is returned.
+        game = self.engine
+        cells = game.body
+        moves = None if self.synced_moves is None else game.moves - self.synced_moves
+        if moves == 0:
+            return set()
+
+        if moves is not None and moves <= len(cells) - 2:
+            changed = self.assign_sprites(moves)
+            changed.update((cells[-1], self.synced_tail))
+        else:
+            self.assign_sprites(len(cells) - 2)
+            self.sprites[cells[-1]] = NO_SPRITE  # We never saw the tail as the neck
+            changed = None
+
+        actions = self.actions
+        self.head = self.sprite_images[HEAD_SPRITES[actions[cells[0] - cells[1]]]]
+        self.tail = self.sprite_images[TAIL_SPRITES[actions[cells[-2] - cells[-1]]]]
+        self.synced_moves = game.moves
+        self.synced_tail = cells[-1]
+        return changed
+
+    def assign_sprites(self, count):  # Sprites of the blocks 1 to count (0 is the head), returns their cells
+        actions = self.actions
+        blocks = list(islice(self.engine.body, count + 2))
+        for index in range(1, count + 1):
+            into = actions[blocks[index] - blocks[index + 1]]  # the move from the tail side into the block
+            out = actions[blocks[index - 1] - blocks[index]]  # the move out of it, towards the head
+            self.sprites[blocks[index]] = BODY_SPRITES[into * 4 + out]
+        return set(blocks[:count + 1])
+
+    def image_at(self, cell):  # The image of the block in a cell (None if Charlie is not there)
+        cells = self.engine.body
+        if self.engine.grid[cell] != self.engine.owner:
+            return None
+        if cell == cells[0]:
+            return self.head
+        if cell == cells[-1]:
+            return self.tail
+        return self.sprite_images[self.sprites[cell]]
+
+    def behind_tail(self):  # The image the tail cell had before the tail moved onto it (None if unknown)
+        sprite = self.sprites[self.engine.body[-1]]
+        return None if sprite == NO_SPRITE else self.sprite_images[sprite]
+
+    def draw_between(self, progress):  # Draw the body with the last move only "progress" (0 to 1) done
+        cells = self.engine.body
+        head, neck, tail = cells[0], cells[1], cells[-1]
+        vacated = self.engine.vacated
+        behind_tail = self.behind_tail()
+        if behind_tail is None:  # We don't know what was under the tail, so it does not slide
+            vacated = None
+        blits = [(self.image_at(cell), cell_rect(cell)) for cell in self.visible_cells()
+                 if cell != head and (cell != tail or vacated is None)]
+
+        if vacated is not None:  # The tail slides out of the cell it left, over the block it moves onto
+            blits.append((behind_tail, cell_rect(tail)))
+            blits.append((self.tail, sliding_rect(vacated, tail, progress)))
+        blits.append((self.head, sliding_rect(neck, head, progress)))  # The head slides out of the neck
+        SCREEN.blits(blits, doreturn=False)
 
     def crunch(self):  # Play the crunch sound when the snake eats fruit
-        self.crunch_sound = pygame.mixer.Sound('Sounds/crunch.wav')
-        self.crunch_sound.set_volume(1.0)
-        self.crunch_sound.play()
+        AUDIO.play('crunch')
 
     def hit(self):  # Play the hit sound when the snake bites itself or hits a wall
-        self.hit_sound = pygame.mixer.Sound('Sounds/hit.wav')
-        self.hit_sound.set_volume(1.0)
-        self.hit_sound.play()
+        AUDIO.play('hit')
+
 
-    def reset(self):
-        self.body = [Vector2(5, 10), Vector2(4, 10), Vector2(3, 10)]
+def save_profile():  # Write the frame timings to PROFILE_PATH (registered with atexit by --profile)
+    # Runs however the program ends: the window closed, Ctrl-C or a crash
+    if PROFILER.enabled and PROFILE_PATH:
+        PROFILER.count("audio", AUDIO.stats())
+        PROFILER.count("text_cache_hits", TEXT.hits)
+        PROFILER.count("text_cache_misses", TEXT.misses)
+        PROFILER.dump(PROFILE_PATH)
+        print("Frame timings saved to", PROFILE_PATH)
 
 
 def close_game():  # Close the game (the program)
@@ -201,115 +339,426 @@ def close_game():  # Close the game (the program)
     sys.exit()
 
 
-def draw_level():  # Draw the game screen
+# The checkerboard never changes, so it is drawn once into its own surface and
+# blitted in one go every frame. It is rebuilt only if the cell or window size changes.
+# It is one cell bigger than the window, so a camera on an odd cell blits it shifted by one.
+LEVEL_SURFACE = None
+LEVEL_SIZE = None  # (CELL_SIZE, view_cells()) the cached surface was built for
+
+
+def sliding_rect(start, end, progress):  # The window area of a block on its way between two cells
+    rect = cell_rect(start)
+    end_rect = cell_rect(end)
+    rect.x += round((end_rect.x - rect.x) * progress)
+    rect.y += round((end_rect.y - rect.y) * progress)
+    return rect
+
+
+def overlay_surface(stats):  # The frame time overlay: frame percentiles, then the slowest phases
+    frame = stats["frame_ms"]
+    lines = [
+        f"frame {frame['p50']:.1f}/{frame['p95']:.1f}/{frame['p99']:.1f} ms",
+        f"fps {1000 / frame['mean'] if frame['mean'] else 0:.0f}  dropped {stats['counters'].get('dropped_ticks', 0)}",
+    ]
+    phases = sorted(stats["phases_ms"].items(), key=lambda phase: -phase[1]["p95"])
+    lines += [f"{name} {times['p50']:.2f}/{times['p95']:.2f}" for name, times in phases if name != "idle"]
+
+    font = TEXT.font(OVERLAY_FONT_SIZE)
+    rendered = [font.render(line, True, Color.White.value) for line in lines]
+    overlay = pygame.Surface((max(line.get_width() for line in rendered) + 8,
+                              sum(line.get_height() + 2 for line in rendered) + 6))
+    overlay.fill(Color.Black.value)
+    y = 4
+    for line in rendered:
+        overlay.blit(line, (4, y))
+        y += line.get_height() + 2
+    return overlay
+
+
+def cells_in(area):  # Packed cells of every board cell that overlaps a window area
+    area = area.clip(SCREEN.get_rect())
+    first_column, first_row = area.left // CELL_SIZE + CAMERA_X, area.top // CELL_SIZE + CAMERA_Y
+    last_column, last_row = (area.right - 1) // CELL_SIZE + CAMERA_X, (area.bottom - 1) // CELL_SIZE + CAMERA_Y
+    return {row * CELL_NUMBER + column
+            for row in range(first_row, last_row + 1)
+            for column in range(first_column, last_column + 1)}
+
+
+def level_area(rect):  # The part of LEVEL_SURFACE that belongs under a window area
+    return rect.move(CAMERA_X % 2 * CELL_SIZE, CAMERA_Y % 2 * CELL_SIZE)
+
+
+def build_level():  # Paint the background and the grass squares into a new surface
+    cells = view_cells() + 1
+    level_surface = pygame.Surface((cells * CELL_SIZE, cells * CELL_SIZE)).convert()
+    level_surface.fill(Color.SCREEN.value)
     grass_color = Color.GRASS.value
-    for row in range(CELL_NUMBER):
-        if row % 2 == 0:
-            for column in range(CELL_NUMBER):
-                if column % 2 == 0:
-                    grass_rect = pygame.Rect(column * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                    pygame.draw.rect(SCREEN, grass_color, grass_rect)
-        else:
-            for column in range(CELL_NUMBER):
-                if column % 2 != 0:
-                    grass_rect = pygame.Rect(column * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                    pygame.draw.rect(SCREEN, grass_color, grass_rect)
+    for row in range(cells):
+        for column in range(row % 2, cells, 2):  # even rows start at column 0, odd rows at 1
+            grass_rect = pygame.Rect(column * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+            level_surface.fill(grass_color, grass_rect)
+    return level_surface
+
+
+def draw_level():  # Draw the game screen
+    global LEVEL_SURFACE, LEVEL_SIZE
+    if LEVEL_SIZE != (CELL_SIZE, view_cells()):
+        LEVEL_SURFACE = build_level()
+        LEVEL_SIZE = (CELL_SIZE, view_cells())
+    SCREEN.blit(LEVEL_SURFACE, (0, 0), level_area(SCREEN.get_rect()))
+
+
+def due_ticks(game, elapsed_ms):  # Fixed timestep of Game and ArenaGame: yields once for every tick to play
+    # Real time piles up in game.accumulator and is spent one game.tick_ms() at a time
+    game.accumulator += elapsed_ms
+    ticks = 0
+    while game.accumulator >= game.tick_ms():
+        game.accumulator -= game.tick_ms()
+        if ticks == MAX_TICKS_PER_FRAME:  # Too far behind, forget the rest instead of fast-forwarding
+            missed = int(game.accumulator // game.tick_ms()) + 1
+            game.dropped_ticks += missed
+            game.accumulator -= (missed - 1) * game.tick_ms()
+            return
+        ticks += 1
+        yield
 
 
-# The Game class represents the game we play
+# The Game class connects the engine to the keyboard, the window and the speakers
 class Game:
-    def __init__(self):
+    def __init__(self, game_engine=None, record_dir=None, skin=1):
+        self.engine = game_engine or engine.Engine(CELL_NUMBER)
+        self.record_dir = record_dir  # Save a replay of every game here (None: don't record)
+        self.recorder = None
         self.Fruit = None
         self.Snake = None
-        self.score = None
-        self.reset(skin_selected=1)
-
-    def play_movements(self):
+        self.skin = 1
+
+        # What the window showed after the last draw, so the next one only repaints what changed
+        self.full_draw = True  # Repaint everything (new game, or another screen drew over the board)
+        self.drawn_ticks = 0
+        self.drawn_fruit = None
+        self.drawn_score = None
+        self.score_area = None  # Window area covered by the score and its apple
+
+        # Fixed timestep: real time piles up in the accumulator and is spent one tick at a time
+        self.accumulator = 0.0  # milliseconds not yet turned into ticks
+        self.inputs = deque()  # directions pressed but not used by a tick yet
+        self.dropped_ticks = 0  # ticks skipped because a frame took far too long
+        self.smooth = SMOOTH_MOVEMENT
+
+        self.show_overlay = False  # Frame time overlay, toggled with F3
+        self.overlay = None
+        self.overlay_rect = None
+        self.overlay_updated = 0
+        self.reset(skin_selected=skin, new_game=game_engine is None)  # A given engine keeps its game
+
+    @property
+    def score(self):
+        return self.engine.score
+
+    def tick_ms(self):  # How long one tick lasts, shorter as Charlie eats if SPEEDUP_MS is set
+        return max(MIN_TICK_MS, TICK_MS - SPEEDUP_MS * self.score)
+
+    def queue_turn(self, action):  # Keep a key press for the next free tick
+        # A press is compared with the last direction Charlie will have when it is used,
+        # so two quick presses can never turn him straight back into his own neck
+        last = self.inputs[-1] if self.inputs else self.engine.direction
+        if action != last and action != engine.OPPOSITE[last] and len(self.inputs) < INPUT_BUFFER:
+            self.inputs.append(action)
+
+    def play_movements(self, elapsed_ms):
         hit_or_bit = False  # check if the player loses
         for game_event in pygame.event.get():
 
             if game_event.type == pygame.QUIT:  # If we press X on the window
                 close_game()  # the game closes
 
+            if game_event.type == pygame.WINDOWEXPOSED:  # The window was covered, repaint all of it
+                self.full_draw = True
+
             if game_event.type == pygame.KEYDOWN:  # If the user presses a key
                 if game_event.key == pygame.K_UP:  # PRESS UP ARROW
-                    if main_Game.Snake.direction.y != 1:
-                        main_Game.Snake.direction = Vector2(0, -1)
+                    self.queue_turn(engine.UP)
                 if game_event.key == pygame.K_DOWN:  # PRESS DOWN ARROW
-                    if main_Game.Snake.direction.y != -1:
-                        main_Game.Snake.direction = Vector2(0, 1)
+                    self.queue_turn(engine.DOWN)
                 if game_event.key == pygame.K_RIGHT:  # PRESS RIGHT ARROW
-                    if main_Game.Snake.direction.x != -1:
-                        main_Game.Snake.direction = Vector2(1, 0)
+                    self.queue_turn(engine.RIGHT)
                 if game_event.key == pygame.K_LEFT:  # PRESS LEFT ARROW
-                    if main_Game.Snake.direction.x != 1:
-                        main_Game.Snake.direction = Vector2(-1, 0)
-
-            # Gameplay Updates
-            if game_event.type == SCREEN_UPDATE:
-                self.Snake.move()
-                self.eat_fruit()
-
-                if self.check_failure():  # If we hit the wall or the snakes bites itself
-                    hit_or_bit = True
-                    return hit_or_bit, self.score
-
+                    self.queue_turn(engine.LEFT)
+                if game_event.key == pygame.K_F3:  # Show or hide the frame time overlay
+                    self.show_overlay = not self.show_overlay
+                    if not PROFILER.enabled:
+                        PROFILER.enable()
+                    self.full_draw = True
+        PROFILER.mark("events")
+
+        # Gameplay Updates: one tick for every full tick_ms of real time that passed
+        for _ in due_ticks(self, elapsed_ms):
+            self.engine.step(self.inputs.popleft() if self.inputs else None)
+            if self.recorder is not None:
+                self.recorder.record()
+            if self.engine.ate:
+                self.Snake.crunch()  # play the crunch sound
+
+            if self.engine.done:  # If we hit the wall, the snakes bites itself or the board is full
+                print(f"Charlie {self.engine.death}!")
+                if self.engine.death != engine.FILLED_BOARD:
+                    self.Snake.hit()
+                self.save_replay()
+                hit_or_bit = True
+                PROFILER.mark("logic")
+                return hit_or_bit, self.score
+
+        PROFILER.count("dropped_ticks", self.dropped_ticks)
+        PROFILER.mark("logic")
         return hit_or_bit, self.score
 
     def draw(self):
         draw_level()
+        PROFILER.mark("draw_level")
         self.Fruit.draw()
+        PROFILER.mark("draw_fruit")
         self.Snake.draw()
+        PROFILER.mark("draw_snake")
         self.draw_score()
+        PROFILER.mark("draw_score")
+        self.remember_drawn()
 
-    def eat_fruit(self):
-        if self.Fruit.pos == self.Snake.body[0]:  # If the snake bites the fruit
-            self.Fruit.randomize_position()  # new fruit
-            self.Snake.add_block()  # snake grows
-            self.Snake.crunch()  # play the crunch sound
-            self.score += 1
-            # print("Current Score: ", self.score)
-
-        # We make sure the new position of the fruit is not at any of the snake's blocks
-        for block in self.Snake.body[1:]:
-            if block == self.Fruit.pos:
-                self.Fruit.randomize_position()  # Randomize again
-
-    def check_failure(self):
-        snake_head = self.Snake.body[0]
-        right_left_wall_bounds = (0 <= snake_head.x <= CELL_NUMBER)
-        up_down_wall_bounds = (0 <= snake_head.y <= CELL_NUMBER)
-
-        # The snake hits the wall
-        if not right_left_wall_bounds or not up_down_wall_bounds:
-            print("Charlie hit the wall!")
-            self.Snake.hit()
-            return True
-
-        # The snake eats itself
-        for block in self.Snake.body[1:]:
-            if block == self.Snake.body[0]:
-                print("Charlie bit himself!")
-                self.Snake.hit()
-                return True
-        return False
-
-    def reset(self, skin_selected):  # When the user restarts the game we must be careful
-        # The selected skin must remain the same (otherwise it becomes default again)
-        self.Snake = Snake()
-        self.Snake.load_skin(skin_selected)  # Pass selected_skin to load_skin
-        self.Fruit = Fruit()
-        self.score = 0
+    def remember_drawn(self):
+        self.full_draw = False
+        self.drawn_ticks = self.engine.ticks
+        self.drawn_fruit = self.engine.fruit
+        self.drawn_score = self.score
 
-    def draw_score(self):  # Display how many apples Charlie ate
-        my_score = str(len(self.Snake.body) - 3)
-        score_surface = TEXT_FONT.render(my_score, True, Color.SCORE.value)
-        score_x = int(CELL_SIZE * CELL_NUMBER - 60)
-        score_y = int(CELL_SIZE * CELL_NUMBER - 40)
+    def draw_smooth(self):  # Repaint the whole window with the head and tail part way to their next cell
+        self.Snake.sync()
+        draw_level()
+        self.Fruit.draw()
+        self.Snake.draw_between(self.accumulator / self.tick_ms())
+        self.draw_score()
+        self.remember_drawn()
+        return [SCREEN.get_rect()]
+
+    def follow_head(self):  # Move the camera with Charlie, the whole window is drawn again when it moves
+        if move_camera(self.engine.body[0]):
+            self.full_draw = True
+
+    def draw_changes(self):  # Repaint only what changed since the last draw, return the areas to update
+        self.follow_head()
+        if self.smooth:
+            return self.draw_smooth()
+        if self.full_draw or self.engine.ticks - self.drawn_ticks > 1:
+            self.draw()
+            return [SCREEN.get_rect()]
+        if self.engine.ticks == self.drawn_ticks:  # Nothing happened, nothing to draw
+            return []
+
+        dirty_cells = self.Snake.sync()
+        PROFILER.mark("draw_snake")
+        if dirty_cells is None:  # Charlie was put down somewhere new
+            self.draw()
+            return [SCREEN.get_rect()]
+        dirty_cells.add(self.drawn_fruit)
+        dirty_cells.add(self.engine.fruit)
+        dirty_cells.discard(None)
+
+        # The score is drawn on top of the board, so the cells under it are repainted together with it
+        score_surface, score_rect, apple_rect = self.score_layout()
+        score_area = score_rect.union(apple_rect).union(self.score_area)
+        score_cells = cells_in(score_area)
+        if self.score != self.drawn_score or not dirty_cells.isdisjoint(score_cells):
+            dirty_cells.update(score_cells)
+        else:
+            score_area = None
+
+        dirty_rects = self.repaint_cells(dirty_cells)
+        PROFILER.mark("draw_cells")
+        if score_area is not None:
+            self.draw_score()
+            PROFILER.mark("draw_score")
+
+        self.remember_drawn()
+        return dirty_rects
+
+    def repaint_cells(self, cells):  # Paint board cells again from what is known about them
+        rects = []
+        window = SCREEN.get_rect()
+        for cell in cells:
+            rect = cell_rect(cell)
+            if not window.colliderect(rect):  # Outside the camera's view
+                continue
+            SCREEN.blit(LEVEL_SURFACE, rect, level_area(rect))  # grass first, then whatever stands on it
+            if cell == self.engine.fruit:
+                SCREEN.blit(self.Fruit.image, rect)
+            image = self.Snake.image_at(cell)
+            if image is not None:
+                SCREEN.blit(image, rect)
+            rects.append(rect)
+        return rects
+
+    def draw_overlay(self, dirty_rects):  # The frame time overlay (F3), on top of everything else
+        if not self.show_overlay:
+            return dirty_rects
+        now = 1000 * time.perf_counter()
+        refresh = self.overlay is None or now - self.overlay_updated >= OVERLAY_REFRESH_MS
+        if refresh:
+            self.overlay_updated = now
+            self.overlay = overlay_surface(PROFILER.stats())
+        overlay_rect = self.overlay.get_rect(topleft=(4, 4))
+        if refresh or overlay_rect.collidelist(dirty_rects) != -1:
+            area = overlay_rect if self.overlay_rect is None else overlay_rect.union(self.overlay_rect)
+            dirty_rects = dirty_rects + self.repaint_cells(cells_in(area))
+            SCREEN.blit(self.overlay, overlay_rect)
+            self.overlay_rect = overlay_rect
+        return dirty_rects
+
+    def save_replay(self):  # Keep the finished game as <seed>.hcr in the replay folder
+        if self.recorder is not None:
+            path = os.path.join(self.record_dir, f"{self.engine.seed}.hcr")
+            self.recorder.save(path)
+            print("Replay saved to", path)
+
+    def reset(self, skin_selected, new_game=True):  # When the user restarts the game we must be careful
+        # The selected skin must remain the same (otherwise it becomes default again)
+        self.skin = skin_selected
+        if new_game:
+            self.engine.reset()
+        if self.record_dir is not None:
+            self.recorder = replay.Recorder(self.engine)
+        self.Snake = Snake(self.engine, skin_selected)  # Pass selected_skin to load_skin
+        self.Fruit = Fruit(self.engine)
+        move_camera(self.engine.body[0], center=True)
+        self.full_draw = True
+        self.accumulator = 0.0
+        self.inputs.clear()
+
+    def score_layout(self):  # The score text and where it and its apple go
+        # The digits are rendered once and reused, so a new score only glues digit images together
+        score_surface = TEXT.number(self.score, SCORE_FONT_SIZE, Color.SCORE.value)
+        score_x = int(window_size() - 60)
+        score_y = int(window_size() - 40)
         score_rect = score_surface.get_rect(center=(score_x, score_y))
         apple_rect = self.Fruit.image.get_rect(midright=(score_rect.left, score_rect.centery))
+        return score_surface, score_rect, apple_rect
+
+    def draw_score(self):  # Display how many apples Charlie ate
+        score_surface, score_rect, apple_rect = self.score_layout()
         SCREEN.blit(score_surface, score_rect)
         SCREEN.blit(self.Fruit.image, apple_rect)
+        self.score_area = score_rect.union(apple_rect)
+
+
+# Arena mode: several snakes and apples on one board (the rules are in arena.py).
+# Player 1 plays with the arrows, player 2 (if there is one) with W A S D and the
+# other snakes are bots. Every snake is drawn by the same Snake class as Charlie.
+PLAYER_KEYS = (
+    {pygame.K_UP: engine.UP, pygame.K_DOWN: engine.DOWN, pygame.K_RIGHT: engine.RIGHT, pygame.K_LEFT: engine.LEFT},
+    {pygame.K_w: engine.UP, pygame.K_s: engine.DOWN, pygame.K_d: engine.RIGHT, pygame.K_a: engine.LEFT},
+)
+
+
+class ArenaGame:
+    def __init__(self, players=1, bots=3, fruits=3, skin=1):
+        if not 1 <= players <= len(PLAYER_KEYS):
+            raise ValueError(f"The arena has 1 to {len(PLAYER_KEYS)} players, not {players}")
+        self.arena = arena.Arena(CELL_NUMBER, players + bots, fruits)
+        self.players = self.arena.snakes[:players]  # The snakes played from the keyboard
+        self.bots = self.arena.snakes[players:]
+        self.Snakes = []  # How every snake of the arena is drawn
+        self.fruit_image = ASSETS.image('apple', CELL_SIZE)
+        self.skin = 1
+
+        self.full_draw = True
+        self.drawn_ticks = 0
+        self.accumulator = 0.0  # milliseconds not yet turned into ticks
+        self.inputs = [deque() for _ in self.players]  # directions pressed by every player
+        self.dropped_ticks = 0  # ticks skipped because a frame took far too long
+        self.reset(skin_selected=skin, new_game=False)
+
+    @property
+    def score(self):  # The best score of the players
+        return max(snake.score for snake in self.players)
+
+    def tick_ms(self):  # Like Game.tick_ms, sped up by the best player's score
+        return max(MIN_TICK_MS, TICK_MS - SPEEDUP_MS * self.score)
+
+    def queue_turn(self, player, action):  # Keep a key press for the next free tick (see Game.queue_turn)
+        inputs = self.inputs[player]
+        last = inputs[-1] if inputs else self.players[player].direction
+        if action != last and action != engine.OPPOSITE[last] and len(inputs) < INPUT_BUFFER:
+            inputs.append(action)
+
+    def play_movements(self, elapsed_ms):
+        for game_event in pygame.event.get():
+            if game_event.type == pygame.QUIT:
+                close_game()
+            if game_event.type == pygame.WINDOWEXPOSED:
+                self.full_draw = True
+            if game_event.type == pygame.KEYDOWN:
+                for player, keys in enumerate(PLAYER_KEYS[:len(self.players)]):
+                    if game_event.key in keys:
+                        self.queue_turn(player, keys[game_event.key])
+        PROFILER.mark("events")
+
+        # Same fixed timestep as Game.play_movements
+        for _ in due_ticks(self, elapsed_ms):
+            actions = [inputs.popleft() if inputs else None for inputs in self.inputs]
+            actions += [arena.greedy_agent(self.arena, snake) if snake.alive else None for snake in self.bots]
+            rewards = self.arena.step(actions)
+            if engine.FRUIT_REWARD in rewards:
+                AUDIO.play('crunch')
+            for player, snake in enumerate(self.players):
+                if rewards[player] == engine.DEATH_REWARD:
+                    print(f"Player {player + 1} {snake.death}!")
+                    AUDIO.play('hit')
+
+            if not any(snake.alive for snake in self.players):  # Every player is out
+                PROFILER.mark("logic")
+                return True, self.score
+
+        PROFILER.count("dropped_ticks", self.dropped_ticks)
+        PROFILER.mark("logic")
+        return False, self.score
+
+    def draw_changes(self):  # Repaint the whole board after every tick, many snakes move at once
+        if not self.full_draw and self.arena.ticks == self.drawn_ticks:
+            return []
+        if self.players[0].alive:  # The camera follows player 1
+            move_camera(self.players[0].body[0])
+        draw_level()
+        SCREEN.blits([(self.fruit_image, cell_rect(fruit)) for fruit in self.arena.fruits], doreturn=False)
+        for snake in self.Snakes:
+            if snake.engine.alive:
+                snake.draw()
+        PROFILER.mark("draw_snake")
+        self.draw_scores()
+        self.full_draw = False
+        self.drawn_ticks = self.arena.ticks
+        return [SCREEN.get_rect()]
+
+    def draw_overlay(self, dirty_rects):  # The frame time overlay is only shown by Game
+        return dirty_rects
+
+    def draw_scores(self):  # Every player's score next to their snake's head, player 1 in the bottom right corner
+        for player, snake in enumerate(self.players):
+            score_surface = TEXT.number(snake.score, SCORE_FONT_SIZE, Color.SCORE.value)
+            score_rect = score_surface.get_rect(center=(window_size() - 60 - 100 * player, window_size() - 40))
+            SCREEN.blit(score_surface, score_rect)
+            SCREEN.blit(self.Snakes[player].head_right, self.fruit_image.get_rect(
+                midright=(score_rect.left, score_rect.centery)))
+
+    def reset(self, skin_selected, new_game=True):
+        self.skin = skin_selected
+        if new_game:
+            self.arena.reset()
+        # Player 1 gets the selected skin, the other snakes take turns with the rest
+        skins = [skin_selected] + [skin for skin in SKINS if skin != skin_selected]
+        self.Snakes = [Snake(snake, skins[index % len(skins)]) for index, snake in enumerate(self.arena.snakes)]
+        move_camera(self.players[0].body[0], center=True)
+        self.full_draw = True
+        self.accumulator = 0.0
+        for inputs in self.inputs:
+            inputs.clear()
 
 
 # Menu screen: The user has 3 options:
@@ -321,27 +770,28 @@ class Menu:
         self.selected_option = 0
         self.skins = ["Skin 1", "Skin 2", "Skin 3"]
         self.selected_skin = 1  # Default skin is 1
-        self.selection_icon = pygame.image.load('Images/apple.png').convert_alpha()
+        self.selection_icon = ASSETS.image('apple', CELL_SIZE)
 
-        self.title_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 50)
-        self.option_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 30)
-        self.notes_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 15)
+        # Font sizes (the texts themselves come from the shared text cache)
+        self.title_size = 50
+        self.option_size = 30
+        self.notes_size = 15
 
     def draw(self):
         SCREEN.fill(Color.Black.value)
 
         # Center coordinates
-        screen_center_x = CELL_NUMBER * CELL_SIZE // 2
-        screen_center_y = CELL_NUMBER * CELL_SIZE // 2
+        screen_center_x = window_size() // 2
+        screen_center_y = window_size() // 2
 
         # Draw title
-        title_surface = self.title_font.render("Hungry Charlie", True, Color.White.value)
+        title_surface = TEXT.render("Hungry Charlie", self.title_size, Color.White.value)
         title_rect = title_surface.get_rect(center=(screen_center_x, screen_center_y - CELL_SIZE * 4))
         SCREEN.blit(title_surface, title_rect)
 
         # Draw menu options
         for i, option in enumerate(self.options):
-            option_surface = self.option_font.render(option, True, Color.White.value)
+            option_surface = TEXT.render(option, self.option_size, Color.White.value)
             option_rect = option_surface.get_rect(
                 center=(screen_center_x, screen_center_y + CELL_SIZE * (i - 1))
             )
@@ -355,9 +805,9 @@ class Menu:
 
         # Draw notes at the bottom with smaller font
         notes_text = "Press Enter or Space to select"
-        notes_surface = self.notes_font.render(notes_text, True, Color.White.value)
+        notes_surface = TEXT.render(notes_text, self.notes_size, Color.White.value)
         notes_rect = notes_surface.get_rect(
-            center=(screen_center_x, CELL_NUMBER * CELL_SIZE - CELL_SIZE // 2)
+            center=(screen_center_x, window_size() - CELL_SIZE // 2)
         )
         SCREEN.blit(notes_surface, notes_rect)
 
@@ -379,14 +829,31 @@ class Menu:
         return None
 
 
+def report_startup(what, counter):  # How long after START_TIME something happened (printed, and kept by --profile)
+    took = 1000 * (time.perf_counter() - START_TIME)
+    print(f"{what} after {took:.0f} ms")
+    PROFILER.count(counter, took)
+
+
+def preload_game():  # Read the skins, the sounds and the other fonts on background threads
+    preloaders = [ASSETS.preload(), AUDIO.preload(), TEXT.preload(GAME_FONT_SIZES)]
+    return [preloader for preloader in preloaders if preloader is not None]
+
+
 def menu_screen(main_menu):
+    preloaders = None
     while True:
         selected_option = main_menu.handle_input()
         main_menu.draw()
         pygame.display.update()
+        if preloaders is None:  # The menu is on screen: the rest of the game loads behind it
+            report_startup("Menu on screen", "menu_shown_ms")
+            preloaders = preload_game()
         CLOCK.tick(FRAMERATE)
 
         if selected_option == 0:  # Play
+            for preloader in preloaders:  # Usually finished long ago, choosing takes a while
+                preloader.join()
             return
         elif selected_option == 1:  # Skin Selection
             continue
@@ -395,8 +862,10 @@ def menu_screen(main_menu):
 
 
 def game_screen(game):
+    CLOCK.tick()  # Time spent in the menu is not game time
     while True:
-        game_over, score = main_Game.play_movements()
+        PROFILER.begin_frame()
+        game_over, score = game.play_movements(CLOCK.get_time())
 
         if game_over:
             print('Final Score: ', score)
@@ -405,14 +874,18 @@ def game_screen(game):
             result = game_over_screen()
 
             if result == "Yes":
-                game.reset(main_Menu.selected_skin)
+                game.reset(game.skin)
+                CLOCK.tick()  # Neither is the time spent on the game over screen
             elif result == "No":
                 close_game()
 
-        SCREEN.fill(Color.SCREEN.value)
-        game.draw()
-        pygame.display.update()
+        # Only the cells that changed during this frame are repainted and sent to the window
+        dirty_rects = game.draw_overlay(game.draw_changes())
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        PROFILER.mark("flip")
         CLOCK.tick(FRAMERATE)
+        PROFILER.mark("idle")
 
 
 # Game Over screen: Basically, the game screen freezes (we can make it black if we wanted to)
@@ -420,30 +893,30 @@ def game_screen(game):
 # The user selects either to continue playing or close the game
 def game_over_screen():
 
-    game_over_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 45)
-    try_again_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 40)
-    options_font = pygame.font.Font("Fonts/ARCADE_R.TTF", 30)
+    # Font sizes of the texts (rendered once by the shared text cache)
+    game_over_size = 45
+    try_again_size = 40
+    options_size = 30
 
     # Center coordinates for the game-over screen
-    go_screen_x = CELL_NUMBER * CELL_SIZE // 2
-    go_screen_y = (CELL_NUMBER * CELL_SIZE // 2) - 20
+    go_screen_x = window_size() // 2
+    go_screen_y = (window_size() // 2) - 20
 
     # Display Game Over text (size 60)
-    game_over_text = game_over_font.render("Game Over", True, Color.Black.value)
+    game_over_text = TEXT.render("Game Over", game_over_size, Color.Black.value)
     game_over_rect = game_over_text.get_rect(center=(go_screen_x, go_screen_y - CELL_SIZE * 2))
     SCREEN.blit(game_over_text, game_over_rect)
 
     # Display Try Again text (size 45)
-    try_again_text = try_again_font.render("Try again?", True, Color.Black.value)
+    try_again_text = TEXT.render("Try again?", try_again_size, Color.Black.value)
     try_again_rect = try_again_text.get_rect(center=(go_screen_x, go_screen_y))
     SCREEN.blit(try_again_text, try_again_rect)
 
     # Display Yes and No options (size 30)
-    yes_option_text = options_font.render("Yes", True, Color.Black.value)
-    yes_option_rect = yes_option_text.get_rect(center=(go_screen_x, go_screen_y + 1.5 * CELL_SIZE))
-
-    no_option_text = options_font.render("No", True, Color.Black.value)
-    no_option_rect = no_option_text.get_rect(center=(go_screen_x, go_screen_y + 3 * CELL_SIZE))
+    yes_option_rect = TEXT.render("Yes", options_size, Color.Black.value).get_rect(
+        center=(go_screen_x, go_screen_y + 1.5 * CELL_SIZE))
+    no_option_rect = TEXT.render("No", options_size, Color.Black.value).get_rect(
+        center=(go_screen_x, go_screen_y + 3 * CELL_SIZE))
 
     selected_option_index = 0  # Default selected option is "Yes"
 
@@ -459,23 +932,50 @@ def game_over_screen():
                 elif event.key in [pygame.K_SPACE, pygame.K_RETURN]:
                     return "Yes" if selected_option_index == 0 else "No"
 
-        if selected_option_index == 0:
-            yes_option_text = options_font.render("Yes", True, Color.White.value)
-            no_option_text = options_font.render("No", True, Color.Black.value)
-        elif selected_option_index == 1:
-            yes_option_text = options_font.render("Yes", True, Color.Black.value)
-            no_option_text = options_font.render("No", True, Color.White.value)
-
-        SCREEN.blit(yes_option_text, yes_option_rect)
-        SCREEN.blit(no_option_text, no_option_rect)
+        # The selected option is white, the other one black
+        yes_color = Color.White.value if selected_option_index == 0 else Color.Black.value
+        no_color = Color.White.value if selected_option_index == 1 else Color.Black.value
+        SCREEN.blit(TEXT.render("Yes", options_size, yes_color), yes_option_rect)
+        SCREEN.blit(TEXT.render("No", options_size, no_color), no_option_rect)
 
         pygame.display.update()
+        CLOCK.tick(FRAMERATE)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hungry Charlie")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every game to this folder")
+    parser.add_argument("--profile", metavar="FILE", help="time every frame and save the timings here on exit")
+    parser.add_argument("--board", type=int, default=CELL_NUMBER, help="cells per side of the board")
+    parser.add_argument("--view", type=int, default=None, help="cells per side shown, the camera follows Charlie")
+    parser.add_argument("--cell-size", type=int, default=None, help="pixels per cell (default: fit the window)")
+    parser.add_argument("--arena", action="store_true", help="several snakes and apples on one board")
+    parser.add_argument("--players", type=int, default=1, help="arena players (2: the second one uses W A S D)")
+    parser.add_argument("--bots", type=int, default=3, help="arena snakes played by the computer")
+    parser.add_argument("--fruits", type=int, default=3, help="apples on the arena board at once")
+    arguments = parser.parse_args()
+    if arguments.board < engine.MIN_CELL_NUMBER:
+        parser.error(f"--board must be at least {engine.MIN_CELL_NUMBER}")
+    view = arguments.view
+    if view is None and arguments.cell_size is None and arguments.board * MIN_CELL_SIZE > FIT_WINDOW_SIZE:
+        view = FIT_WINDOW_SIZE // MIN_CELL_SIZE  # Not even the smallest cells fit, the camera follows Charlie
+    shown = min(arguments.board, view or arguments.board)  # Cells across the window
+    configure_board(arguments.board, arguments.cell_size or fit_cell_size(shown), view)
+    if arguments.profile:
+        PROFILE_PATH = arguments.profile
+        PROFILER.enable()
+        atexit.register(save_profile)
+    if arguments.record:
+        os.makedirs(arguments.record, exist_ok=True)
+
+    init_display()  # Only now the window opens
     main_Menu = Menu()  # First screen: Menu
-    main_Game = Game()  # Second screen: Game
-    menu_screen(main_Menu)  # Show menu to user
-    main_Game.Snake.skin = main_Menu.selected_skin  # Which skin the user selected
-    main_Game.Snake.load_skin(main_Game.Snake.skin)  # Whatever skin they selected, we put the correct skin images
+    menu_screen(main_Menu)  # Show menu to user (skins, sounds and fonts load meanwhile)
+
+    # Second screen: Game (or the arena), made only now so it starts with the skin the user selected
+    if arguments.arena:
+        main_Game = ArenaGame(arguments.players, arguments.bots, arguments.fruits, main_Menu.selected_skin)
+    else:
+        main_Game = Game(record_dir=arguments.record, skin=main_Menu.selected_skin)
+    report_startup("Game ready", "game_ready_ms")
     game_screen(main_Game)  # Game start! Enjoy Playing <3
@@ -0,0 +1,80 @@
+# ------------------FRAME PROFILER-----------------
+# Measures where the time of every frame goes. The game calls begin_frame() at the top
+# of each frame and mark(phase) after each part of it (events, logic, every draw step,
+# the display update), and the profiler keeps the last few seconds of timings to give
+# p50/p95/p99 per phase. While disabled every call returns straight away.
+import json
+import time
+from collections import deque
+# -------------------------------------------------
+
+WINDOW = 600  # Frames kept for the rolling statistics (10 seconds at 60 fps)
+
+
+def percentiles(samples):  # Summary of a list of milliseconds
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": ordered[int(0.50 * last)],
+        "p95": ordered[int(0.95 * last)],
+        "p99": ordered[int(0.99 * last)],
+        "max": ordered[last],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+class Profiler:
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.frames = deque(maxlen=window)  # milliseconds from one frame start to the next
+        self.phases = {}  # phase name -> deque of milliseconds
+        self.frame_count = 0
+        self.frame_started = None
+        self.last_mark = 0.0
+        self.counters = {}  # other numbers worth reporting (dropped ticks, cache hits...)
+
+    def enable(self):
+        self.enabled = True
+        self.frame_started = None  # The time spent disabled is not a frame
+        self.last_mark = time.perf_counter()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_started is not None:
+            self.frames.append(1000 * (now - self.frame_started))
+            self.frame_count += 1
+        self.frame_started = self.last_mark = now
+
+    def mark(self, phase):  # The time since the last mark was spent on this phase
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        samples = self.phases.get(phase)
+        if samples is None:
+            samples = self.phases[phase] = deque(maxlen=self.window)
+        samples.append(1000 * (now - self.last_mark))
+        self.last_mark = now
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counters[name] = value
+
+    def stats(self):
+        return {
+            "frames": self.frame_count,
+            "frame_ms": percentiles(self.frames),
+            "phases_ms": {phase: percentiles(samples) for phase, samples in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def dump(self, path):  # Write the statistics as JSON
+        with open(path, "w") as stats_file:
+            json.dump(self.stats(), stats_file, indent=2)
+
+
+PROFILER = Profiler()  # Shared by the whole game
@@ -0,0 +1,201 @@
+# ------------------REPLAYS-----------------
+# A game of Hungry Charlie is decided by its seed (where the apples go) and by the
+# direction Charlie moved on every tick. A replay file stores just that: the seed and
+# the directions, 2 bits each, run-length encoded, so a long game takes a few hundred
+# bytes. It also stores how the game ended, so playing it back can be checked.
+#
+#   python replay.py info game.hcr     what is in the file
+#   python replay.py verify game.hcr   play it headless at full speed and check the ending
+#   python replay.py play game.hcr     watch it in the game window (LEFT/RIGHT seek, SPACE pause)
+import argparse
+import struct
+import sys
+import zlib
+import engine
+# ------------------------------------------
+
+MAGIC = b"HCRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBHQIIIIB")  # magic, version, cell_number, seed, ticks, score, length, state hash, death (index into engine.DEATHS)
+SNAPSHOT_INTERVAL = 256  # The player keeps a snapshot every this many ticks to seek quickly
+
+
+class ReplayMismatch(Exception):  # The game played back does not end like the recorded one
+    pass
+
+
+def state_hash(game):  # A checksum of where Charlie and the apple are
+    fruit = -1 if game.fruit is None else game.fruit
+    checksum = zlib.crc32(struct.pack(f"<{len(game.body)}q", *game.body))  # The same bytes on every platform
+    return zlib.crc32(struct.pack("<qII", fruit, game.score, game.ticks), checksum)
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+# Records the games played on an engine: call record() after every engine.step()
+class Recorder:
+    def __init__(self, game_engine):
+        self.engine = game_engine
+        self.seed = game_engine.seed
+        self.cell_number = game_engine.cell_number
+        self.runs = []  # [direction, how many ticks in a row]
+
+    def record(self):
+        direction = self.engine.direction
+        if self.runs and self.runs[-1][0] == direction:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([direction, 1])
+
+    def to_bytes(self):
+        game = self.engine
+        death = engine.DEATHS.index(game.death)
+        data = bytearray(HEADER.pack(MAGIC, VERSION, self.cell_number, self.seed, game.ticks,
+                                     game.score, len(game.body), state_hash(game), death))
+        for direction, count in self.runs:
+            write_varint(data, count << 2 | direction)
+        return bytes(data)
+
+    def save(self, path):
+        with open(path, "wb") as replay_file:
+            replay_file.write(self.to_bytes())
+
+
+# A replay file read back into memory
+class Replay:
+    def __init__(self, data):
+        (magic, version, self.cell_number, self.seed, self.ticks, self.score, self.length,
+         self.state_hash, death) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Hungry Charlie replay (or a newer version)")
+        self.death = engine.DEATHS[death]
+
+        self.directions = bytearray()  # one direction per tick
+        position = HEADER.size
+        while position < len(data):
+            run, position = read_varint(data, position)
+            self.directions.extend(bytes([run & 3]) * (run >> 2))
+        if len(self.directions) != self.ticks:
+            raise ValueError("The replay is cut short")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            return cls(replay_file.read())
+
+
+# Plays a replay on its own engine: forwards tick by tick, or jumps to any tick
+class Player:
+    def __init__(self, replay):
+        self.replay = replay
+        self.engine = engine.Engine(replay.cell_number, replay.seed)
+        self.snapshots = [self.engine.snapshot()]  # snapshots[i] is the game at tick i * SNAPSHOT_INTERVAL
+
+    @property
+    def finished(self):
+        return self.engine.ticks >= self.replay.ticks
+
+    def step(self):
+        if self.finished:
+            return
+        self.engine.step(self.replay.directions[self.engine.ticks])
+        if self.engine.ticks % SNAPSHOT_INTERVAL == 0 and self.engine.ticks // SNAPSHOT_INTERVAL == len(self.snapshots):
+            self.snapshots.append(self.engine.snapshot())
+
+    def seek(self, tick):  # Jump to a tick from the closest snapshot before it
+        tick = max(0, min(tick, self.replay.ticks))
+        known = min(tick // SNAPSHOT_INTERVAL, len(self.snapshots) - 1)
+        if not (known * SNAPSHOT_INTERVAL <= self.engine.ticks <= tick):
+            self.engine.restore(self.snapshots[known])
+        while self.engine.ticks < tick:
+            self.step()
+
+    def verify(self):  # Play to the end and make sure it ends exactly like the recording
+        self.seek(self.replay.ticks)
+        game = self.engine
+        if (game.score, len(game.body), game.death, state_hash(game)) != \
+                (self.replay.score, self.replay.length, self.replay.death, self.replay.state_hash):
+            raise ReplayMismatch(f"Replay ended with score {game.score} ({game.death}), "
+                                 f"recorded {self.replay.score} ({self.replay.death})")
+        return game
+
+
+def play_window(replay, speed=1.0):  # Watch a replay with the game's own renderer
+    import pygame
+    import main as window
+
+    window.configure_board(replay.cell_number, window.fit_cell_size(replay.cell_number))
+    window.init_display()
+    player = Player(replay)
+    game = window.Game(player.engine)
+    tick_ms = window.TICK_MS / speed
+    elapsed = 0.0
+    paused = False
+    window.CLOCK.tick()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                window.close_game()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):  # Seek 10 seconds of game time
+                    jump = 10000 // window.TICK_MS
+                    player.seek(player.engine.ticks + (jump if event.key == pygame.K_RIGHT else -jump))
+                    game.full_draw = True
+
+        if not paused:
+            elapsed += window.CLOCK.get_time()
+            while elapsed >= tick_ms and not player.finished:
+                elapsed -= tick_ms
+                player.step()
+                if player.engine.ate:
+                    game.Snake.crunch()
+
+        dirty_rects = game.draw_changes()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        window.CLOCK.tick(window.FRAMERATE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, check or watch Hungry Charlie replays.")
+    parser.add_argument("command", choices=["info", "verify", "play"])
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed in the window")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    if args.command == "info":
+        print(f"board {replay.cell_number}x{replay.cell_number}, seed {replay.seed}, {replay.ticks} ticks, "
+              f"score {replay.score}, Charlie {replay.death or 'was still playing'}")
+    elif args.command == "verify":
+        try:
+            Player(replay).verify()
+        except ReplayMismatch as error:
+            print(error)
+            return 1
+        print(f"OK: score {replay.score} after {replay.ticks} ticks")
+    else:
+        play_window(replay, args.speed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
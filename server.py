@@ -0,0 +1,216 @@
+# ------------------GAME SERVER-----------------
+# Runs a game of Hungry Charlie on one machine and streams it to any number of viewers
+# over TCP. A viewer gets the whole game once when it connects (a snapshot) and then
+# one small delta per tick: where the head went, which cell the tail left, where the
+# apple is and the score. That is 22 bytes per tick however long Charlie is.
+#
+# The tick loop never waits for a viewer. A viewer too slow to keep up misses deltas
+# until it has caught up with what was already sent, then it gets a fresh snapshot,
+# so one slow connection can never slow the game down for everybody else.
+#
+#   python server.py                    remote players steer Charlie (client.py --play)
+#   python server.py --agent greedy     a bot plays, everybody watches
+#   python client.py                    watch (see client.py)
+import argparse
+import asyncio
+import struct
+import sys
+from collections import deque
+import engine
+import tournament
+# ----------------------------------------------
+
+HOST = "127.0.0.1"
+PORT = 7777
+TICK_MS = 140  # The same speed as the game window
+RESTART_MS = 2000  # A finished game stays on screen this long before the next one starts
+BUFFER_LIMIT = 4096  # Bytes waiting to be sent to a viewer before it is considered too slow
+BACKLOG = 1024  # Connections waiting to be accepted (a crowd of viewers joining at once)
+INPUT_BUFFER = 3  # Turns waiting for a tick, like main.INPUT_BUFFER
+
+# Messages from the server (all little-endian, cells are packed engine cells, -1 for none)
+SNAPSHOT = 1  # The whole game, followed by `length` uint32 body cells (head first)
+DELTA = 2  # What changed during one tick
+SNAPSHOT_HEADER = struct.Struct("<BHIIiBBI")  # kind, cell_number, ticks, score, fruit, direction, death, length
+DELTA_MESSAGE = struct.Struct("<BIiiiIB")  # kind, ticks, new head, vacated tail, fruit, score, death
+
+
+def encode_snapshot(game):
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT, game.cell_number, game.ticks, game.score,
+                                  -1 if game.fruit is None else game.fruit, game.direction,
+                                  engine.DEATHS.index(game.death), len(game.body))
+    return header + struct.pack(f"<{len(game.body)}I", *game.body)
+
+
+def encode_delta(game, moved):  # The last tick of the game (moved: did Charlie move at all?)
+    head = game.body[0] if moved else -1
+    vacated = -1 if game.vacated is None else game.vacated
+    fruit = -1 if game.fruit is None else game.fruit
+    return DELTA_MESSAGE.pack(DELTA, game.ticks, head, vacated, fruit, game.score, engine.DEATHS.index(game.death))
+
+
+async def read_message(reader):  # The next message as (kind, fields, body cells)
+    kind = (await reader.readexactly(1))[0]
+    if kind == SNAPSHOT:
+        fields = SNAPSHOT_HEADER.unpack(bytes([kind]) + await reader.readexactly(SNAPSHOT_HEADER.size - 1))
+        length = fields[-1]
+        body = struct.unpack(f"<{length}I", await reader.readexactly(4 * length))
+        return kind, fields, body
+    if kind == DELTA:
+        fields = DELTA_MESSAGE.unpack(bytes([kind]) + await reader.readexactly(DELTA_MESSAGE.size - 1))
+        return kind, fields, None
+    raise ValueError(f"Unknown message kind {kind}")
+
+
+def apply_snapshot(game, fields, body):  # Make a viewer's engine look like the server's
+    _, _, game.ticks, game.score, fruit, game.direction, death, _ = fields
+    game.place_body(body)
+    game.fruit = None if fruit == -1 else fruit
+    game.death = engine.DEATHS[death]
+    game.done = game.death is not None
+    game.new_block = False
+    game.ate = False
+    game.vacated = None
+
+
+def apply_delta(game, fields):  # Play one tick of the server's game on a viewer's engine
+    _, ticks, head, vacated, fruit, score, death = fields
+    game.vacated = None
+    if head != -1:  # The engine itself moves Charlie, so the viewer's body, grid and move counter stay right
+        game.direction = game.steps.index(head - game.body[0])
+        game.new_block = vacated == -1
+        game.move()
+    game.ate = score > game.score
+    game.ticks = ticks
+    game.fruit = None if fruit == -1 else fruit
+    game.score = score
+    game.death = engine.DEATHS[death]
+    game.done = game.death is not None
+
+
+# One connected viewer. Messages go straight into its connection's write buffer, and
+# the size of that buffer tells how far behind the viewer is: past buffer_limit it stops
+# getting deltas, and once everything sent so far has gone out it gets a snapshot.
+class Viewer:
+    def __init__(self, writer, buffer_limit=BUFFER_LIMIT):
+        self.transport = writer.transport
+        self.buffer_limit = buffer_limit
+        self.behind = False  # Waiting for its write buffer to empty, then for a snapshot
+        self.resyncs = 0  # How many times it fell behind and got a snapshot instead
+
+    def send(self, message, server):  # Never waits
+        transport = self.transport
+        if transport.is_closing():
+            return
+        if self.behind:
+            if transport.get_write_buffer_size():  # Still sending what it fell behind with
+                return
+            message = server.snapshot()  # The game as it is now, instead of the deltas it missed
+            self.behind = False
+        elif transport.get_write_buffer_size() > self.buffer_limit:  # Too slow
+            self.behind = True
+            self.resyncs += 1
+            return
+        transport.write(message)
+
+
+class GameServer:
+    def __init__(self, game_engine=None, agent=None, tick_ms=TICK_MS, buffer_limit=BUFFER_LIMIT):
+        self.engine = game_engine or engine.Engine()
+        self.agent = agent  # Plays when given, otherwise the viewers' turns steer Charlie
+        self.tick_ms = tick_ms
+        self.buffer_limit = buffer_limit
+        self.viewers = set()
+        self.inputs = deque()  # Turns sent by the viewers, one is used per tick
+        self.finished_ticks = 0  # Ticks since the game ended
+        self.cached_snapshot = None  # encode_snapshot() of the current tick, shared by every viewer
+
+    def snapshot(self):
+        if self.cached_snapshot is None:
+            self.cached_snapshot = encode_snapshot(self.engine)
+        return self.cached_snapshot
+
+    def queue_turn(self, action):  # Same rules as main.Game.queue_turn
+        last = self.inputs[-1] if self.inputs else self.engine.direction
+        if action != last and action != engine.OPPOSITE[last] and len(self.inputs) < INPUT_BUFFER:
+            self.inputs.append(action)
+
+    def broadcast(self, message):  # One write per viewer, the same bytes for everybody
+        for viewer in self.viewers:
+            viewer.send(message, self)
+
+    def tick(self):  # One tick of the game, sent to every viewer
+        game = self.engine
+        self.cached_snapshot = None  # The game is about to change
+        if game.done:  # Leave the end of the game on screen for a while, then start the next one
+            self.finished_ticks += 1
+            if self.finished_ticks * self.tick_ms >= RESTART_MS:
+                self.finished_ticks = 0
+                self.inputs.clear()
+                game.reset()
+                self.broadcast(self.snapshot())
+            return
+        if self.agent is not None:
+            action = self.agent(game)
+        else:
+            action = self.inputs.popleft() if self.inputs else None
+        moves = game.moves
+        game.step(action)
+        self.broadcast(encode_delta(game, game.moves != moves))
+
+    async def run_ticks(self):  # Ticks on a fixed schedule, late ticks are caught up straight away
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick_ms / 1000
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self.tick()
+
+    async def serve_viewer(self, reader, writer):  # Runs for every connection until it closes
+        viewer = Viewer(writer, self.buffer_limit)
+        writer.write(self.snapshot())  # Every viewer starts with a snapshot
+        self.viewers.add(viewer)
+        try:
+            while True:  # Anything a viewer sends is a turn: one byte, engine.UP to engine.LEFT
+                data = await reader.read(64)
+                if not data:
+                    break
+                if self.agent is None:
+                    for action in data:
+                        if action < len(engine.DIRECTIONS):
+                            self.queue_turn(action)
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.serve_viewer, host, port, backlog=BACKLOG)
+        print(f"Hungry Charlie server on {host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a game of Hungry Charlie to viewers over TCP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--board", type=int, default=engine.CELL_NUMBER, help="cells per side of the board")
+    parser.add_argument("--agent", help="let a bot play: a tournament agent or module:function")
+    parser.add_argument("--tick-ms", type=int, default=TICK_MS, help="milliseconds per tick")
+    args = parser.parse_args(argv)
+    if args.board < engine.MIN_CELL_NUMBER:
+        parser.error(f"--board must be at least {engine.MIN_CELL_NUMBER}")
+
+    agent = tournament.load_agent(args.agent) if args.agent else None
+    server = GameServer(engine.Engine(args.board), agent, args.tick_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
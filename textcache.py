@@ -0,0 +1,80 @@
+# ------------------TEXT CACHE-----------------
+# Rendering text with a TTF font is slow, and the game shows the same few strings
+# every frame. Fonts are opened once per size and rendered text is kept in a
+# least-recently-used cache, so a frame where no text changed renders nothing.
+# Numbers (the score) are put together from one cached image per digit.
+import threading
+from collections import OrderedDict
+import pygame
+# ---------------------------------------------
+
+FONT_PATH = "Fonts/ARCADE_R.TTF"
+CACHE_SIZE = 256  # How many rendered strings are kept
+
+
+class TextCache:
+    def __init__(self, font_path=FONT_PATH, max_entries=CACHE_SIZE):
+        self.font_path = font_path
+        self.max_entries = max_entries
+        self.fonts = {}  # size -> pygame Font
+        self.surfaces = OrderedDict()  # (font, size, text, color) -> rendered surface, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.preloader = None  # background thread started by preload()
+
+    def font(self, size):  # Open the font at this size (only the first time)
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(self.font_path, size)
+            self.fonts[size] = font
+        return font
+
+    def preload(self, sizes):  # Open the fonts at these sizes on a thread (the ones not needed right away)
+        def open_all():
+            for size in sizes:
+                self.font(size)
+
+        self.preloader = threading.Thread(target=open_all, name="font-preloader", daemon=True)
+        self.preloader.start()
+        return self.preloader
+
+    def lookup(self, key):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.surfaces.move_to_end(key)  # recently used, evicted last
+        return surface
+
+    def store(self, key, surface):
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)  # forget the least recently used text
+        return surface
+
+    def render(self, text, size, color):  # Same as Font.render(text, True, color), but cached
+        key = (self.font_path, size, text, color)
+        surface = self.lookup(key)
+        if surface is None:
+            surface = self.store(key, self.font(size).render(text, True, color))
+        return surface
+
+    def number(self, value, size, color):  # A number glued together from the cached digit images
+        text = str(value)
+        key = (self.font_path, size, "#" + text, color)
+        surface = self.lookup(key)
+        if surface is None:
+            digits = [self.render(digit, size, color) for digit in text]
+            width = sum(digit.get_width() for digit in digits)
+            height = max(digit.get_height() for digit in digits)
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            x = 0
+            for digit in digits:
+                surface.blit(digit, (x, 0))
+                x += digit.get_width()
+            surface = self.store(key, surface)
+        return surface
+
+
+TEXT = TextCache()  # Shared by the whole game
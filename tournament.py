@@ -0,0 +1,212 @@
+# ------------------AGENT TOURNAMENT-----------------
+# Plays lots of headless games of Hungry Charlie on every CPU core, each game driven
+# by an agent instead of the keyboard, and reports how the agent did.
+#
+#   python tournament.py greedy --games 100000
+#   python tournament.py random greedy --games 20000 --out results.jsonl
+#   python tournament.py my_bots:wall_hugger --board 30
+#
+# An agent is any function that gets the engine.Engine of the game and returns the
+# action for the next tick (engine.UP, DOWN, RIGHT, LEFT or None to keep going).
+# The built-in ones are listed in AGENTS, others are given as "module:function".
+import argparse
+import importlib
+import json
+import os
+import math
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import engine
+# ---------------------------------------------------
+
+TIMED_OUT = "timed out"  # The game was stopped after max_ticks (an agent going round in circles)
+
+
+def random_agent(game):  # Any direction at all
+    return random.randrange(4)
+
+
+def safe_moves(game):  # Directions that do not kill Charlie on the next tick
+    head_x, head_y = game.xy(game.body[0])
+    tail = game.body[-1]
+    moves = []
+    for action, (step_x, step_y) in enumerate(engine.DIRECTIONS):
+        if action == engine.OPPOSITE[game.direction]:
+            continue
+        x, y = head_x + step_x, head_y + step_y
+        if not (0 <= x < game.cell_number and 0 <= y < game.cell_number):
+            continue
+        cell = game.cell(x, y)
+        if game.grid[cell] and (cell != tail or game.new_block):
+            continue
+        moves.append((action, x, y))
+    return moves
+
+
+def greedy_agent(game):  # Straight for the apple, without crashing on the next tick
+    moves = safe_moves(game)
+    if not moves:
+        return None
+    fruit_x, fruit_y = game.xy(game.fruit)
+    return min(moves, key=lambda move: abs(move[1] - fruit_x) + abs(move[2] - fruit_y))[0]
+
+
+AGENTS = {
+    "random": random_agent,
+    "greedy": greedy_agent,
+}
+
+
+def load_agent(name):  # A built-in agent, or "module:function"
+    if name in AGENTS:
+        return AGENTS[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown agent {name!r}: use one of {sorted(AGENTS)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def play_game(agent, game, seed, max_ticks):  # One full game, returns its result as a dict
+    random.seed(seed)  # Agents using the random module play the same game for the same seed
+    game.reset(seed)
+    while not game.done and game.ticks < max_ticks:
+        game.step(agent(game))
+    return {
+        "seed": seed,
+        "score": game.score,
+        "length": len(game.body),
+        "ticks": game.ticks,
+        "death": game.death if game.done else TIMED_OUT,
+    }
+
+
+def play_shard(agent_name, cell_number, seeds, max_ticks):  # Runs inside a worker process
+    agent = load_agent(agent_name)
+    game = engine.Engine(cell_number)
+    return [play_game(agent, game, seed, max_ticks) for seed in seeds]
+
+
+# Running totals of the games played so far. A game is added as soon as it comes back,
+# so a tournament of millions of games only keeps one count per score and per death.
+class Tally:
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.score_sum = 0
+        self.score_squares = 0  # sum of the squared scores, for the standard deviation
+        self.scores = Counter()  # score -> how many games ended with it
+        self.deaths = Counter()
+
+    def add(self, result):
+        self.games += 1
+        self.ticks += result["ticks"]
+        self.score_sum += result["score"]
+        self.score_squares += result["score"] * result["score"]
+        self.scores[result["score"]] += 1
+        self.deaths[result["death"]] += 1
+
+    def percentile(self, fraction):  # The score of game int(fraction * games) in score order
+        rank = min(self.games - 1, int(fraction * self.games))
+        for score in sorted(self.scores):
+            rank -= self.scores[score]
+            if rank < 0:
+                return score
+
+
+def summarize(agent_name, tally, seconds):
+    games = tally.games
+    return {
+        "agent": agent_name,
+        "games": games,
+        "seconds": seconds,
+        "games_per_second": games / seconds if seconds else 0.0,
+        "ticks_per_second": tally.ticks / seconds if seconds else 0.0,
+        "score_mean": tally.score_sum / games,
+        # Whole numbers all the way, so the sums cancel exactly however many games were played
+        "score_stdev": math.sqrt((games * tally.score_squares - tally.score_sum ** 2) / games ** 2),
+        "score_min": min(tally.scores),
+        "score_p50": tally.percentile(0.50),
+        "score_p90": tally.percentile(0.90),
+        "score_p99": tally.percentile(0.99),
+        "score_max": max(tally.scores),
+        "deaths": dict(tally.deaths),
+    }
+
+
+def run(agent_name, games, cell_number=engine.CELL_NUMBER, seed=0, chunk=500, workers=None,
+        max_ticks=None, on_result=None):
+    # Plays `games` games with seeds seed, seed + 1, ... sharded over a process pool.
+    # Every finished game is passed to on_result as soon as its shard comes back, only
+    # its totals are kept here.
+    if max_ticks is None:
+        max_ticks = 50 * cell_number * cell_number
+    if games < 1:  # There is nothing to summarize without a game
+        raise ValueError(f"A tournament plays at least 1 game, not {games}")
+    load_agent(agent_name)  # Fail here, not in every worker
+    tally = Tally()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        shards = [pool.submit(play_shard, agent_name, cell_number,
+                              range(first, min(first + chunk, seed + games)), max_ticks)
+                  for first in range(seed, seed + games, chunk)]
+        for shard in as_completed(shards):
+            for result in shard.result():
+                tally.add(result)
+                if on_result is not None:
+                    on_result(result)
+    return summarize(agent_name, tally, time.perf_counter() - start)
+
+
+def print_summary(summary):
+    print(f"{summary['agent']}: {summary['games']} games in {summary['seconds']:.1f}s "
+          f"({summary['games_per_second']:,.0f} games/s, {summary['ticks_per_second']:,.0f} ticks/s)")
+    print(f"  score mean {summary['score_mean']:.2f} (sd {summary['score_stdev']:.2f})  "
+          f"min {summary['score_min']}  p50 {summary['score_p50']}  p90 {summary['score_p90']}  "
+          f"p99 {summary['score_p99']}  max {summary['score_max']}")
+    print("  " + "  ".join(f"{death}: {count}" for death, count in sorted(summary["deaths"].items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play headless Hungry Charlie games with scripted agents.")
+    parser.add_argument("agents", nargs="+", help=f"built-in agent ({', '.join(AGENTS)}) or module:function")
+    parser.add_argument("--games", type=int, default=10000, help="games per agent")
+    parser.add_argument("--board", type=int, default=engine.CELL_NUMBER, help="cells per side of the board")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (every game gets its own)")
+    parser.add_argument("--chunk", type=int, default=500, help="games sent to a worker at a time")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--max-ticks", type=int, default=None, help="stop a game after this many ticks")
+    parser.add_argument("--out", help="write every game result to this file as JSON lines")
+    parser.add_argument("--summary", help="write the summaries to this file as JSON")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.board < engine.MIN_CELL_NUMBER:
+        parser.error(f"--board must be at least {engine.MIN_CELL_NUMBER}")
+
+    out = open(args.out, "w") if args.out else None
+    summaries = []
+    try:
+        for agent_name in args.agents:
+            def on_result(result):
+                if out is not None:
+                    out.write(json.dumps(dict(result, agent=agent_name)) + "\n")
+
+            summary = run(agent_name, args.games, args.board, args.seed, args.chunk, args.workers,
+                          args.max_ticks, on_result)
+            print_summary(summary)
+            summaries.append(summary)
+    finally:
+        if out is not None:
+            out.close()
+
+    if args.summary:
+        with open(args.summary, "w") as summary_file:
+            json.dump(summaries, summary_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())